@@ -0,0 +1,247 @@
+"""Placement benchmarks on seeded synthetic stations.
+
+Run with `python -m app.benchmark --output bench.json` and compare the JSON
+between commits. Every benchmark reports wall time, peak traced memory,
+volume utilization and the share of invalid (out of bounds or overlapping)
+placements.
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import List, Dict, Tuple, Any
+
+import numpy as np
+
+from app.models import Item, Container, Dimensions, Position
+from app.placement import (
+    GuilotineBin, MaximalSpaceBin, FitnessArrays, fitness_function, batch_fitness_function,
+    seed_population, hybrid_placement
+)
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+
+# Zone mix of a typical station: most cargo lives in general storage
+ZONE_WEIGHTS = {"A": 0.4, "B": 0.3, "C": 0.2, "D": 0.1}
+
+# Priority skews toward routine (middle) items
+PRIORITY_WEIGHTS = {1: 0.1, 2: 0.2, 3: 0.4, 4: 0.2, 5: 0.1}
+
+# Share of total container volume the generated items fill
+TARGET_FILL = 0.6
+
+
+def generate_station(n_items: int, seed: int = 0) -> Tuple[List[Container], List[Item]]:
+    """Seeded containers and items with realistic zone, priority and expiry distributions"""
+    rng = random.Random(seed)
+    base_date = datetime(2025, 1, 1)
+    zones = list(ZONE_WEIGHTS)
+    priorities = list(PRIORITY_WEIGHTS)
+
+    items = []
+    for i in range(n_items):
+        # Mostly small kits with a long tail of bulky items
+        scale = 3 if rng.random() < 0.05 else 1
+        dimensions = Dimensions(
+            rng.randint(5, 25) * scale,
+            rng.randint(5, 25) * scale,
+            rng.randint(5, 25) * scale
+        )
+
+        # Perishables expire within months, hardware effectively never
+        if rng.random() < 0.3:
+            expiry_date = base_date + timedelta(days=rng.randint(7, 180), hours=rng.randint(0, 23))
+        else:
+            expiry_date = base_date + timedelta(days=rng.randint(365, 3650))
+
+        items.append(Item(
+            f"ITM{i:05d}",
+            f"{rng.choice(['food', 'medical', 'tool', 'spare', 'science'])} kit {i}",
+            dimensions,
+            rng.choices(priorities, weights=list(PRIORITY_WEIGHTS.values()))[0],
+            expiry_date,
+            rng.randint(1, 50),
+            rng.choices(zones, weights=list(ZONE_WEIGHTS.values()))[0],
+            round(rng.uniform(0.1, 20.0), 2)
+        ))
+
+    # Enough 100 wide, 200 deep, 100 high containers for the items to fill TARGET_FILL of them
+    item_volume = sum(item.dimensions.volume() for item in items)
+    container_volume = 100 * 100 * 200
+    n_containers = max(len(zones), int(np.ceil(item_volume / (container_volume * TARGET_FILL))))
+
+    containers = [
+        Container(
+            f"CNT{c:04d}",
+            zones[c % len(zones)],
+            Dimensions(100, 200, 100),
+            Position((c % 10) * 150, 0, (c // 10) * 150)
+        )
+        for c in range(n_containers)
+    ]
+
+    return containers, items
+
+
+def placement_quality(placements, containers: List[Container]) -> Tuple[float, float]:
+    """Volume utilization of valid placements and the share of invalid ones
+
+    placements is a list of (item, container_id, position) as returned by
+    hybrid_placement.
+    """
+    if not placements:
+        return 0.0, 0.0
+
+    by_id = {container.id: container for container in containers}
+    grouped: Dict[str, List[Tuple[Item, Position]]] = {}
+    for item, container_id, position in placements:
+        grouped.setdefault(container_id, []).append((item, position))
+
+    invalid = 0
+    valid_volume = 0.0
+    for container_id, members in grouped.items():
+        container = by_id[container_id]
+        low = np.array([(p.x, p.y, p.z) for _, p in members], dtype=float)
+        size = np.array([(i.dimensions.width, i.dimensions.height, i.dimensions.depth) for i, _ in members],
+                        dtype=float)
+        high = low + size
+        limit = np.array([container.dimensions.width, container.dimensions.height, container.dimensions.depth])
+
+        bad = np.any(low < 0, axis=1) | np.any(high > limit, axis=1)
+        overlap = np.all((low[:, None, :] < high[None, :, :]) & (high[:, None, :] > low[None, :, :]), axis=-1)
+        np.fill_diagonal(overlap, False)
+        bad |= overlap.any(axis=1)
+
+        invalid += int(bad.sum())
+        valid_volume += float(np.prod(size[~bad], axis=1).sum())
+
+    total_volume = sum(container.dimensions.volume() for container in containers)
+    return valid_volume / total_volume, invalid / len(placements)
+
+
+def _measure(fn):
+    """Run fn under tracemalloc, returning (result, wall seconds, peak MB)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = fn()
+    finally:
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, elapsed, peak / (1024 * 1024)
+
+
+def _pack(bin_class, containers, items):
+    """First-fit every item into per-container bins, returning placements"""
+    bins = [bin_class(c.dimensions.width, c.dimensions.height, c.dimensions.depth) for c in containers]
+    placements = []
+    for item in items:
+        for container, bin in zip(containers, bins):
+            success, x, y, z = bin.insert(item.dimensions.width, item.dimensions.height, item.dimensions.depth)
+            if success:
+                placements.append((item, container.id, Position(x, y, z)))
+                break
+    return placements
+
+
+def run_benchmarks(sizes=None, seed=0, population_size=20, generations=20, time_budget=None,
+                   max_reference_items=1000) -> List[Dict[str, Any]]:
+    """Run every benchmark at every size, returning one result record per run"""
+    results = []
+
+    for n_items in sizes or DEFAULT_SIZES:
+        containers, items = generate_station(n_items, seed)
+
+        def record(benchmark, elapsed, peak, placements=None, **extra):
+            entry = {
+                "benchmark": benchmark,
+                "items": n_items,
+                "containers": len(containers),
+                "wall_time_s": elapsed,
+                "peak_memory_mb": peak,
+            }
+            if placements is not None:
+                utilization, invalid_share = placement_quality(placements, containers)
+                entry.update(
+                    placed=len(placements),
+                    volume_utilization=utilization,
+                    invalid_share=invalid_share
+                )
+            entry.update(extra)
+            results.append(entry)
+
+        for name, bin_class in (("guillotine_bin", GuilotineBin), ("maximal_space_bin", MaximalSpaceBin)):
+            placements, elapsed, peak = _measure(lambda: _pack(bin_class, containers, items))
+            record(name, elapsed, peak, placements)
+
+        # Score the same seeded population with the reference and batched scorers
+        random.seed(seed)
+        population = seed_population(containers, items, population_size)
+        arrays = FitnessArrays(containers, items)
+
+        if n_items <= max_reference_items:
+            _, elapsed, peak = _measure(
+                lambda: [fitness_function(solution, containers, items, {}) for solution in population]
+            )
+            record("fitness_function", elapsed, peak, population=population_size)
+
+        _, elapsed, peak = _measure(lambda: batch_fitness_function(population, arrays))
+        record("batch_fitness_function", elapsed, peak, population=population_size)
+
+        (placements, _), elapsed, peak = _measure(lambda: hybrid_placement(
+            containers, items, seed=seed, time_budget=time_budget,
+            population_size=population_size, generations=generations
+        ))
+        record("hybrid_placement", elapsed, peak, placements, generations=generations)
+
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark placement on synthetic stations")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--population-size", type=int, default=20)
+    parser.add_argument("--generations", type=int, default=20)
+    parser.add_argument("--time-budget", type=float, default=None)
+    parser.add_argument("--max-reference-items", type=int, default=1000,
+                        help="largest size to also time the pure-Python fitness_function on")
+    parser.add_argument("--output", default=None, help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "seed": args.seed,
+        "results": run_benchmarks(
+            args.sizes, args.seed, args.population_size, args.generations,
+            args.time_budget, args.max_reference_items
+        ),
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import csv
+import json
+import math
+from datetime import datetime
+from itertools import islice
+from typing import List, Dict, Tuple, Any, Iterator, Iterable, TextIO
+from app.models import CargoSystem, Item, Container, Dimensions, Position
+from app.placement import place_new_items
+
+MANIFEST_FORMATS = ("csv", "jsonl")
+
+
+def iter_manifest_rows(stream: TextIO, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """Yield (row number, row) lazily from a CSV or JSON-lines manifest
+
+    Rows that cannot be decoded are yielded as the exception so the caller
+    can report them alongside validation errors.
+    """
+    if fmt == "csv":
+        for row_number, row in enumerate(csv.DictReader(stream), start=1):
+            yield row_number, row
+    elif fmt == "jsonl":
+        for row_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield row_number, json.loads(line)
+            except ValueError as e:
+                yield row_number, e
+    else:
+        raise ValueError(f"Unsupported manifest format: {fmt}")
+
+
+def _dimensions(row: Dict) -> Dimensions:
+    """Parse width, depth and height, each of which must be a finite number above zero"""
+    dims = row.get("dimensions") or row
+    values = {}
+    for name in ("width", "depth", "height"):
+        value = float(dims[name])
+        if not math.isfinite(value) or value <= 0:
+            raise ValueError(f"{name} must be a finite positive number, got {dims[name]!r}")
+        values[name] = value
+    return Dimensions(values["width"], values["depth"], values["height"])
+
+
+def parse_item_row(row: Dict) -> Item:
+    """Build an Item from a manifest row using the same field names as Item.to_dict"""
+    item_id = str(row.get("itemId") or row.get("id") or "").strip()
+    if not item_id:
+        raise ValueError("missing itemId")
+
+    return Item(
+        item_id,
+        str(row["name"]),
+        _dimensions(row),
+        int(row["priority"]),
+        datetime.fromisoformat(str(row["expiryDate"])),
+        int(row["usageLimit"]),
+        str(row["preferredZone"]),
+        float(row.get("weight") or 0)
+    )
+
+
+def parse_container_row(row: Dict) -> Container:
+    """Build a Container from a manifest row using the same field names as Container.to_dict"""
+    container_id = str(row.get("containerId") or row.get("id") or "").strip()
+    if not container_id:
+        raise ValueError("missing containerId")
+
+    position = row.get("position") or row
+    return Container(
+        container_id,
+        str(row["zone"]),
+        _dimensions(row),
+        Position(float(position.get("x") or 0), float(position.get("y") or 0), float(position.get("z") or 0))
+    )
+
+
+def _chunks(rows: Iterable, size: int) -> Iterator[List]:
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_manifest(stream: TextIO, cargo_system: CargoSystem, kind: str = "items", fmt: str = "csv",
+                    chunk_size: int = 1000, place: bool = False, user_id: str = "system") -> Iterator[Dict]:
+    """Stream a manifest into the cargo system chunk by chunk, yielding progress per chunk
+
+    Each chunk is validated, inserted through the bulk add path (one log entry
+    per chunk) and, for items with place=True, handed straight to
+    place_new_items. Only one chunk is held in memory at a time.
+    """
+    if kind == "items":
+        parse, existing, bulk_add = parse_item_row, cargo_system.items, cargo_system.add_items
+    elif kind == "containers":
+        parse, existing, bulk_add = parse_container_row, cargo_system.containers, cargo_system.add_containers
+    else:
+        raise ValueError(f"Unsupported manifest kind: {kind}")
+
+    rows_read = imported = failed = placed = 0
+
+    for chunk_number, chunk in enumerate(_chunks(iter_manifest_rows(stream, fmt), chunk_size), start=1):
+        parsed = []
+        seen = set()
+        errors = []
+
+        for row_number, row in chunk:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                if not isinstance(row, dict):
+                    raise ValueError("row must be an object")
+
+                record = parse(row)
+                if record.id in existing or record.id in seen:
+                    raise ValueError(f"duplicate id {record.id}")
+            except (KeyError, TypeError, ValueError) as e:
+                message = f"missing field {e}" if isinstance(e, KeyError) else str(e)
+                errors.append({"row": row_number, "error": message})
+                continue
+
+            seen.add(record.id)
+            parsed.append(record)
+
+        bulk_add(parsed, user_id)
+
+        rows_read += len(chunk)
+        imported += len(parsed)
+        failed += len(errors)
+        progress = {"chunk": chunk_number, "rowsRead": rows_read, "imported": imported, "failed": failed}
+
+        if place and kind == "items":
+            placements, unplaced = place_new_items(cargo_system, parsed) if parsed else ([], [])
+            placed += len(placements)
+            progress["placed"] = placed
+            progress["unplaced"] = [item.id for item in unplaced]
+
+        progress["errors"] = errors
+        yield progress
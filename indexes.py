@@ -0,0 +1,454 @@
+import bisect
+import math
+from collections import Counter
+from datetime import datetime
+from typing import List, Dict, Tuple, Optional, Callable, Any, Iterator
+from app.rtree import RTreeIndex
+
+
+def item_terms(item) -> List[str]:
+    """Searchable terms of an item: its name, id and preferred zone, lower-cased"""
+    terms = []
+    terms.extend(item.name.lower().split())
+    terms.extend(item.id.lower().split())
+    terms.extend(item.preferred_zone.lower().split())
+    return terms
+
+
+class InvertedIndex:
+    """Term -> postings (doc_id -> term frequency) index with the document stats BM25 needs"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_terms: Dict[str, Counter] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.total_length = 0
+        # Insertion ordinal per document, used to break score ties deterministically
+        self.doc_order: Dict[str, int] = {}
+        self._next_order = 0
+        # Largest term frequency per term, dropped (and lazily recomputed) when it may shrink
+        self._max_tf: Dict[str, int] = {}
+        # Bumped on every change so readers holding derived state can tell it went stale
+        self.version = 0
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.doc_lengths
+
+    def add(self, doc_id: str, terms: List[str]) -> None:
+        """Index a document, replacing any previous version of it"""
+        if doc_id in self.doc_lengths:
+            self._unlink(doc_id)
+        else:
+            self.doc_order[doc_id] = self._next_order
+            self._next_order += 1
+
+        counts = Counter(terms)
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+            if term in self._max_tf:
+                self._max_tf[term] = max(self._max_tf[term], tf)
+
+        self.doc_terms[doc_id] = counts
+        self.doc_lengths[doc_id] = len(terms)
+        self.total_length += len(terms)
+        self.version += 1
+
+    def remove(self, doc_id: str) -> None:
+        if doc_id not in self.doc_lengths:
+            return
+        self._unlink(doc_id)
+        del self.doc_order[doc_id]
+        self.version += 1
+
+    def _unlink(self, doc_id):
+        for term in self.doc_terms.pop(doc_id):
+            postings = self.postings[term]
+            del postings[doc_id]
+            self._max_tf.pop(term, None)
+            if not postings:
+                del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(doc_id)
+
+    def max_tf(self, term: str) -> int:
+        """Highest term frequency of term in any document (0 if absent)"""
+        if term not in self._max_tf:
+            self._max_tf[term] = max(self.postings.get(term, {}).values(), default=0)
+        return self._max_tf[term]
+
+    def term_upper_bound(self, term: str, k1=1.5, b=0.75) -> float:
+        """Largest BM25 contribution term can make to any document's score
+
+        Uses the term's max frequency and a zero document length, which
+        maximizes tf / (tf + k1 * (1 - b + b * len / avg_len)).
+        """
+        tf = self.max_tf(term)
+        if not tf:
+            return 0.0
+        return self.idf(term) * tf * (k1 + 1) / (tf + k1 * (1 - b))
+
+    def avg_doc_length(self) -> float:
+        return self.total_length / max(1, len(self.doc_lengths))
+
+    def idf(self, term: str) -> float:
+        containing_docs = len(self.postings.get(term, ()))
+        return math.log((len(self.doc_lengths) + 1) / (containing_docs + 1)) + 1
+
+    def bm25_scores(self, query_terms: List[str], k1=1.5, b=0.75,
+                    accept: Optional[Callable[[str], bool]] = None) -> Dict[str, float]:
+        """BM25 scores of every document containing a query term, read from the postings
+
+        accept, if given, filters candidate doc ids before they are scored.
+        """
+        avg_doc_length = self.avg_doc_length()
+        scores: Dict[str, float] = {}
+
+        for term in query_terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+
+            idf = self.idf(term)
+            for doc_id, tf in postings.items():
+                if accept is not None and not accept(doc_id):
+                    continue
+
+                # BM25 formula
+                numerator = tf * (k1 + 1)
+                denominator = tf + k1 * (1 - b + b * self.doc_lengths[doc_id] / avg_doc_length)
+
+                scores[doc_id] = scores.get(doc_id, 0) + idf * (numerator / denominator)
+
+        return scores
+
+    def bm25_score(self, doc_id: str, query_terms: List[str], k1=1.5, b=0.75) -> float:
+        """BM25 score of a single document, summed in query term order like bm25_scores"""
+        doc_terms = self.doc_terms[doc_id]
+        length_norm = 1 - b + b * self.doc_lengths[doc_id] / self.avg_doc_length()
+        score = 0
+
+        for term in query_terms:
+            tf = doc_terms.get(term)
+            if tf:
+                score += self.idf(term) * (tf * (k1 + 1) / (tf + k1 * length_norm))
+
+        return score
+
+
+class SpatialIndex:
+    """Station-wide R-tree over absolute item positions (container position + item position)
+
+    Moves delete the old point from the tree and insert the new one.
+    """
+
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self.points: Dict[str, Tuple[float, float, float]] = {}
+        self.tree = RTreeIndex(max_entries)
+
+    def __len__(self):
+        return len(self.points)
+
+    def __contains__(self, item_id):
+        return item_id in self.points
+
+    def update(self, item_id: str, point: Tuple[float, float, float]) -> None:
+        """Index item_id at an absolute point, replacing its previous point"""
+        self.points[item_id] = point
+        self.tree.insert(item_id, point + point)
+
+    def remove(self, item_id: str) -> None:
+        if self.points.pop(item_id, None) is not None:
+            self.tree.delete(item_id)
+
+    def within(self, center: Tuple[float, float, float], radius: float) -> Dict[str, float]:
+        """item_id -> distance for every indexed point within radius of center"""
+        x, y, z = center
+        candidates = self.tree.query((x - radius, y - radius, z - radius,
+                                                 x + radius, y + radius, z + radius))
+
+        # The box query over-approximates the sphere; keep the exact hits
+        result = {}
+        for item_id in candidates:
+            distance = math.dist(center, self.points[item_id])
+            if distance <= radius:
+                result[item_id] = distance
+        return result
+
+    def nearest(self, center: Tuple[float, float, float], k: int = 1,
+                predicate: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """The k closest (item_id, distance) pairs, nearest first, optionally only ids passing predicate
+
+        Best-first search of the tree (RTreeIndex.nearest), so only the
+        nodes that can hold one of the k closest points are opened.
+        """
+        if k < 1:
+            return []
+        return self.tree.nearest(center, k, predicate)
+
+
+def max_edits(token: str) -> int:
+    """Typos tolerated in a query token: none for short tokens, up to two for long ones"""
+    if len(token) < 4:
+        return 0
+    if len(token) < 8:
+        return 1
+    return 2
+
+
+class AutocompleteIndex:
+    """Character trie over the vocabulary of an InvertedIndex for prefix and typo-tolerant lookups
+
+    Documents and postings stay in the inverted index; this only tracks its
+    terms. Terms whose last document went away are skipped on lookup and
+    dropped when the trie is rebuilt, once dead terms outnumber live ones.
+    """
+
+    def __init__(self, inverted_index: InvertedIndex):
+        self.inverted_index = inverted_index
+        self.terms = set()
+        # Nested dicts keyed by character; the None key holds the term ending at that node
+        self.root: Dict = {}
+
+    def add(self, terms: List[str]) -> None:
+        for term in terms:
+            if term in self.terms:
+                continue
+            self.terms.add(term)
+            node = self.root
+            for char in term:
+                node = node.setdefault(char, {})
+            node[None] = term
+
+    def _compact(self) -> None:
+        postings = self.inverted_index.postings
+        if len(self.terms) > 2 * len(postings):
+            live = [term for term in self.terms if term in postings]
+            self.terms = set()
+            self.root = {}
+            self.add(live)
+
+    def _collect(self, node: Dict, edits: int, matches: Dict[str, int]) -> None:
+        postings = self.inverted_index.postings
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for char, child in node.items():
+                if char is None:
+                    if child in postings and edits < matches.get(child, edits + 1):
+                        matches[child] = edits
+                else:
+                    stack.append(child)
+
+    def prefix_matches(self, token: str) -> Dict[str, int]:
+        """term -> 0 for live terms starting with token"""
+        self._compact()
+        node = self.root
+        for char in token:
+            node = node.get(char)
+            if node is None:
+                return {}
+        matches = {}
+        self._collect(node, 0, matches)
+        return matches
+
+    def fuzzy_matches(self, token: str, limit: int) -> Dict[str, int]:
+        """term -> edits for live terms with a prefix within limit edits of token
+
+        Walks the trie carrying one edit distance row (optimal string
+        alignment, so an adjacent swap is one edit) per depth, and abandons a
+        branch as soon as every cell of its row exceeds limit.
+        """
+        self._compact()
+        n = len(token)
+        matches: Dict[str, int] = {}
+        # (node, char into node, row above, row two above, best distance along the path)
+        stack = [(self.root, None, list(range(n + 1)), None, n)]
+
+        while stack:
+            node, char, row, above, best = stack.pop()
+            for next_char, child in node.items():
+                if next_char is None:
+                    continue
+                current = [row[0] + 1] + [0] * n
+                for i in range(1, n + 1):
+                    cost = 0 if token[i - 1] == next_char else 1
+                    current[i] = min(row[i] + 1, current[i - 1] + 1, row[i - 1] + cost)
+                    if (above is not None and i > 1 and token[i - 1] == char
+                            and token[i - 2] == next_char):
+                        current[i] = min(current[i], above[i - 2] + 1)
+
+                child_best = min(best, current[n])
+                if min(current) <= limit:
+                    if child_best <= limit and None in child:
+                        term = child[None]
+                        if term in self.inverted_index.postings and child_best < matches.get(term, limit + 1):
+                            matches[term] = child_best
+                    stack.append((child, next_char, current, row, child_best))
+                elif child_best <= limit:
+                    # No deeper prefix can do better; the whole subtree matches
+                    self._collect(child, child_best, matches)
+
+        return matches
+
+
+class AttributeIndex:
+    """Secondary indexes over item attributes for filters that would otherwise scan every item
+
+    Hash indexes map each value of priority, preferred_zone, container_id and
+    depleted (no uses left) to the ids holding it; expiry dates are kept in a
+    sorted list for range queries. Expiry changes are buffered and merged on
+    the next range query, so bulk loads do not pay for sorted inserts.
+    """
+
+    HASHED = ("priority", "preferred_zone", "container_id", "depleted")
+
+    def __init__(self):
+        self.hashed: Dict[str, Dict[Any, set]] = {name: {} for name in self.HASHED}
+        # item_id -> indexed values, to unlink an item without looking it up again
+        self.values: Dict[str, Dict[str, Any]] = {}
+        self.order: Dict[str, int] = {}
+        self._next_order = 0
+        # (ordinal, item_id) in insertion order; removed items are skipped and compacted away
+        self._sequence: List[Tuple[int, str]] = []
+        self._expiry: List[Tuple[datetime, str]] = []
+        self._expiry_pending: List[Tuple[datetime, str]] = []
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, item) -> None:
+        """Index an item, or reindex it after any of its indexed attributes changed"""
+        values = {
+            "priority": item.priority,
+            "preferred_zone": item.preferred_zone,
+            "container_id": item.container_id,
+            "depleted": item.remaining_uses() <= 0,
+            "expiry_date": item.expiry_date
+        }
+
+        previous = self.values.get(item.id)
+        if previous == values:
+            return
+        if previous is None:
+            self.order[item.id] = self._next_order
+            self._sequence.append((self._next_order, item.id))
+            self._next_order += 1
+        else:
+            self._unlink(item.id, previous)
+
+        for name in self.HASHED:
+            self.hashed[name].setdefault(values[name], set()).add(item.id)
+        if previous is None or previous["expiry_date"] != values["expiry_date"]:
+            self._expiry_pending.append((values["expiry_date"], item.id))
+        self.values[item.id] = values
+
+    def remove(self, item_id: str) -> None:
+        previous = self.values.pop(item_id, None)
+        if previous is not None:
+            self._unlink(item_id, previous)
+            del self.order[item_id]
+            if len(self._sequence) > 2 * len(self.values) + 64:
+                self._sequence = [(ordinal, item_id) for ordinal, item_id in self._sequence
+                                  if self.order.get(item_id) == ordinal]
+
+    def _unlink(self, item_id, previous):
+        for name in self.HASHED:
+            ids = self.hashed[name][previous[name]]
+            ids.discard(item_id)
+            if not ids:
+                del self.hashed[name][previous[name]]
+
+    def iter_ordered(self, after: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """Lazily yield (ordinal, item_id) of indexed items in insertion order, past after"""
+        sequence = self._sequence
+        start = 0 if after is None else bisect.bisect_left(sequence, (after + 1, ""))
+        for position in range(start, len(sequence)):
+            ordinal, item_id = sequence[position]
+            if self.order.get(item_id) == ordinal:
+                yield ordinal, item_id
+
+    def iter_matching(self, after: Optional[int] = None, expires_from: Optional[datetime] = None,
+                      expires_before: Optional[datetime] = None, **filters: Any) -> Iterator[Tuple[int, str]]:
+        """Lazily yield (ordinal, item_id) of items matching every filter, in insertion order past after
+
+        Takes the same filters as query, but walks iter_ordered and tests
+        each id against the hashed sets, smallest first, and its expiry date,
+        so a page costs the items it skips rather than every match.
+        """
+        sets = []
+        for name, value in filters.items():
+            if name not in self.hashed:
+                raise ValueError(f"No index on item attribute: {name}")
+            sets.append(self.lookup(name, value))
+        sets.sort(key=len)
+        if sets and not sets[0]:
+            return
+
+        for ordinal, item_id in self.iter_ordered(after):
+            if not all(item_id in ids for ids in sets):
+                continue
+            expiry = self.values[item_id]["expiry_date"]
+            if expires_from is not None and expiry < expires_from:
+                continue
+            if expires_before is not None and expiry >= expires_before:
+                continue
+            yield ordinal, item_id
+
+    def lookup(self, name: str, value: Any) -> set:
+        """Ids whose attribute `name` equals value"""
+        return self.hashed[name].get(value, set())
+
+    def _sorted_expiry(self) -> List[Tuple[datetime, str]]:
+        if self._expiry_pending:
+            # Drop entries of removed items and superseded expiry dates while merging
+            merged = sorted(set(self._expiry + self._expiry_pending))
+            self._expiry = [
+                (date, item_id) for date, item_id in merged
+                if item_id in self.values and self.values[item_id]["expiry_date"] == date
+            ]
+            self._expiry_pending = []
+        return self._expiry
+
+    def expiring(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[str]:
+        """Ids with start <= expiry_date < end, soonest first; either bound may be open"""
+        entries = self._sorted_expiry()
+        low = 0 if start is None else bisect.bisect_left(entries, (start, ""))
+        high = len(entries) if end is None else bisect.bisect_left(entries, (end, ""), low)
+
+        result = []
+        for date, item_id in entries[low:high]:
+            # Skip entries left behind by removals since the last merge
+            values = self.values.get(item_id)
+            if values is not None and values["expiry_date"] == date:
+                result.append(item_id)
+        return result
+
+    def query(self, expires_from: Optional[datetime] = None, expires_before: Optional[datetime] = None,
+              **filters: Any) -> List[str]:
+        """Ids matching every given filter, in insertion order
+
+        filters are equality tests on the hashed attributes, e.g.
+        query(priority=5, preferred_zone="A"); the expiry bounds select a
+        half-open date range. Result sets are intersected smallest first.
+        """
+        sets = []
+        for name, value in filters.items():
+            if name not in self.hashed:
+                raise ValueError(f"No index on item attribute: {name}")
+            sets.append(self.lookup(name, value))
+        if expires_from is not None or expires_before is not None:
+            sets.append(set(self.expiring(expires_from, expires_before)))
+
+        if not sets:
+            return sorted(self.values, key=self.order.__getitem__)
+
+        sets.sort(key=len)
+        result = set(sets[0])
+        for ids in sets[1:]:
+            if not result:
+                break
+            result &= ids
+        return sorted(result, key=self.order.__getitem__)
@@ -3,8 +3,10 @@ from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from app.auth import get_current_user
+from app.routes import router
 
 app = FastAPI()
+app.include_router(router)
 
 # Mount static files directory for CSS, JS, and images.
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
-from typing import List, Dict, Tuple, Optional, Any
+from typing import List, Dict, Tuple, Optional, Any, Callable, Iterable, Iterator
 import uuid
+from app.indexes import InvertedIndex, SpatialIndex, AutocompleteIndex, AttributeIndex, item_terms
 
 
 class Position:
@@ -38,6 +39,36 @@ class Container:
         self.dimensions = dimensions
         self.position = position
         self.items: List[Item] = []
+        # Bumped whenever items enter or leave, so derived caches know when to refresh
+        self.version = 0
+        # OccupancyGrid of the contents (see app.occupancy), built on first use
+        self.occupancy = None
+        # ArrayRTreeIndex over placed item boxes (see app.retrieval.container_rtree), built on first use
+        self.rtree = None
+
+    def add_item(self, item: "Item") -> None:
+        self.items.append(item)
+        self.version += 1
+        if self.occupancy is not None:
+            self.occupancy.add(item)
+            self.occupancy.version = self.version
+        if self.rtree is not None:
+            if item.position is not None:
+                self.rtree.insert(item.id, item.bounds())
+            self.rtree.version = self.version
+
+    def remove_item(self, item: "Item") -> bool:
+        if item not in self.items:
+            return False
+        self.items.remove(item)
+        self.version += 1
+        if self.occupancy is not None:
+            self.occupancy.remove(item.id)
+            self.occupancy.version = self.version
+        if self.rtree is not None:
+            self.rtree.delete(item.id)
+            self.rtree.version = self.version
+        return True
 
     def available_volume(self) -> float:
         used_volume = sum(item.dimensions.volume() for item in self.items)
@@ -70,6 +101,17 @@ class Item:
         self.container_id: Optional[str] = None
         self.position: Optional[Position] = None
 
+    def bounds(self) -> Tuple[float, float, float, float, float, float]:
+        """(min_x, min_y, min_z, max_x, max_y, max_z) box of the item within its container"""
+        return (
+            self.position.x,
+            self.position.y,
+            self.position.z,
+            self.position.x + self.dimensions.width,
+            self.position.y + self.dimensions.height,
+            self.position.z + self.dimensions.depth
+        )
+
     def is_expired(self, current_date: datetime) -> bool:
         return current_date > self.expiry_date
 
@@ -85,20 +127,33 @@ class Item:
             return True
         return False
 
-    def to_dict(self) -> Dict:
-        return {
-            "id": self.id,
-            "name": self.name,
-            "dimensions": self.dimensions.to_dict(),
-            "priority": self.priority,
-            "expiryDate": self.expiry_date.isoformat(),
-            "usageLimit": self.usage_limit,
-            "usageCount": self.usage_count,
-            "preferredZone": self.preferred_zone,
-            "weight": self.weight,
-            "containerId": self.container_id,
-            "position": self.position.to_dict() if self.position else None
-        }
+    def to_dict(self, fields: Optional[Iterable[str]] = None) -> Dict:
+        """Serialized item; with fields, only those keys are built, in the given order"""
+        if fields is None:
+            fields = ITEM_FIELDS
+        return {field: ITEM_FIELDS[field](self) for field in fields}
+
+
+# Item.to_dict keys and how to build each, so projections skip the fields nobody asked for
+ITEM_FIELDS: Dict[str, Callable[[Item], Any]] = {
+    "id": lambda item: item.id,
+    "name": lambda item: item.name,
+    "dimensions": lambda item: item.dimensions.to_dict(),
+    "priority": lambda item: item.priority,
+    "expiryDate": lambda item: item.expiry_date.isoformat(),
+    "usageLimit": lambda item: item.usage_limit,
+    "usageCount": lambda item: item.usage_count,
+    "preferredZone": lambda item: item.preferred_zone,
+    "weight": lambda item: item.weight,
+    "containerId": lambda item: item.container_id,
+    "position": lambda item: item.position.to_dict() if item.position else None
+}
+
+
+# Item attributes CargoSystem.update_item may change; identity and location go through their own methods
+UPDATABLE_ITEM_FIELDS = (
+    "name", "dimensions", "priority", "expiry_date", "usage_limit", "usage_count", "preferred_zone", "weight"
+)
 
 
 class LogEntry:
@@ -130,15 +185,85 @@ class CargoSystem:
         self.containers: Dict[str, Container] = {}
         self.logs: List[LogEntry] = []
         self.current_date = datetime.now()
+        # Search index over item names, ids and zones, kept current on every change
+        self.search_index = InvertedIndex()
+        # Prefix and typo-tolerant lookups over the search index's vocabulary
+        self.autocomplete_index = AutocompleteIndex(self.search_index)
+        # R-tree over absolute item positions, kept current on every placement
+        self.spatial_index = SpatialIndex()
+        # Hash indexes by priority, zone, container and depletion plus a sorted expiry index
+        self.attribute_index = AttributeIndex()
+        # Bumped on every mutation so derived results (e.g. cached searches) can tell they went stale
+        self.epoch = 0
 
     def add_item(self, item: Item) -> None:
         self.items[item.id] = item
+        terms = item_terms(item)
+        self.search_index.add(item.id, terms)
+        self.autocomplete_index.add(terms)
+        self.attribute_index.add(item)
+        self.epoch += 1
         self.log_action("add_item", item.id, "system")
 
+    def update_item(self, item_id: str, **fields: Any) -> bool:
+        """Change item data fields (UPDATABLE_ITEM_FIELDS) in place and keep the indexes in sync
+
+        A placed item whose dimensions change is taken out of its container
+        and put back, so the container's occupancy grid and R-tree see the
+        new box.
+        """
+        if item_id not in self.items:
+            return False
+
+        unknown = sorted(set(fields) - set(UPDATABLE_ITEM_FIELDS))
+        if unknown:
+            raise AttributeError(f"Cannot update item field: {unknown[0]}")
+
+        item = self.items[item_id]
+        container = self.containers.get(item.container_id)
+        reshaped = container is not None and "dimensions" in fields
+        if reshaped:
+            container.remove_item(item)
+        for name, value in fields.items():
+            setattr(item, name, value)
+        if reshaped:
+            container.add_item(item)
+
+        terms = item_terms(item)
+        self.search_index.add(item.id, terms)
+        self.autocomplete_index.add(terms)
+        self.attribute_index.add(item)
+        self.epoch += 1
+        self.log_action("update_item", item_id, "system", {"fields": sorted(fields)})
+        return True
+
+    def add_items(self, items: List[Item], user_id: str = "system") -> None:
+        """Bulk insert that writes one summarized log entry instead of one per item"""
+        for item in items:
+            self.items[item.id] = item
+            terms = item_terms(item)
+            self.search_index.add(item.id, terms)
+            self.autocomplete_index.add(terms)
+            self.attribute_index.add(item)
+        if items:
+            self.epoch += 1
+            self.log_action("bulk_add_items", "", user_id,
+                            {"count": len(items), "item_ids": [item.id for item in items]})
+
     def add_container(self, container: Container) -> None:
         self.containers[container.id] = container
+        self.epoch += 1
         self.log_action("add_container", container.id, "system")
 
+    def add_containers(self, containers: List[Container], user_id: str = "system") -> None:
+        """Bulk insert that writes one summarized log entry instead of one per container"""
+        for container in containers:
+            self.containers[container.id] = container
+        if containers:
+            self.epoch += 1
+            self.log_action("bulk_add_containers", "", user_id,
+                            {"count": len(containers), "container_ids": [c.id for c in containers]})
+
     def place_item(self, item_id: str, container_id: str, position: Position) -> bool:
         if item_id not in self.items or container_id not in self.containers:
             return False
@@ -146,12 +271,24 @@ class CargoSystem:
         item = self.items[item_id]
         container = self.containers[container_id]
 
+        # Take the item out of the container it is moving from
+        previous = self.containers.get(item.container_id)
+        if previous is not None:
+            previous.remove_item(item)
+
         # Update item location
         item.container_id = container_id
         item.position = position
 
         # Add item to container
-        container.items.append(item)
+        container.add_item(item)
+        self.spatial_index.update(item_id, (
+            container.position.x + position.x,
+            container.position.y + position.y,
+            container.position.z + position.z
+        ))
+        self.attribute_index.add(item)
+        self.epoch += 1
 
         self.log_action("place_item", item_id, "system",
                         {"container_id": container_id, "position": position.to_dict()})
@@ -166,6 +303,8 @@ class CargoSystem:
         # Check usage limit
         if not item.use():
             return False
+        self.attribute_index.add(item)
+        self.epoch += 1
 
         # If fully used, mark for removal
         if item.remaining_uses() <= 0:
@@ -175,18 +314,57 @@ class CargoSystem:
         self.log_action("retrieve", item_id, user_id)
         return True
 
+    def remove_item(self, item_id: str, user_id: str = "system") -> bool:
+        """Take an item off the station, out of its container and every index"""
+        item = self.items.pop(item_id, None)
+        if item is None:
+            return False
+
+        container = self.containers.get(item.container_id)
+        if container is not None:
+            container.remove_item(item)
+
+        self.search_index.remove(item_id)
+        self.spatial_index.remove(item_id)
+        self.attribute_index.remove(item_id)
+        self.epoch += 1
+
+        self.log_action("remove_item", item_id, user_id)
+        return True
+
+    def find_items(self, **filters: Any) -> List[Item]:
+        """Items matching every filter, answered from the attribute indexes
+
+        Accepts priority, preferred_zone, container_id and depleted equality
+        filters plus an expires_from / expires_before date range; see
+        AttributeIndex.query.
+        """
+        return [self.items[item_id] for item_id in self.attribute_index.query(**filters)]
+
+    def iter_items(self, after: Optional[int] = None, **filters: Any) -> Iterator[Tuple[int, Item]]:
+        """Lazily yield (ordinal, item) in insertion order, optionally filtered
+
+        Ordinals only grow, so the last one seen is a stable resume point
+        (pass it back as after) even when items are added or removed in
+        between. filters are the same as for find_items.
+        """
+        for ordinal, item_id in self.attribute_index.iter_matching(after, **filters):
+            yield ordinal, self.items[item_id]
+
     def get_waste_items(self) -> List[Item]:
-        return [item for item in self.items.values()
-                if item.is_wasted(self.current_date)]
+        # Expired (expiry before now) or out of uses
+        wasted = set(self.attribute_index.expiring(end=self.current_date))
+        wasted.update(self.attribute_index.lookup("depleted", True))
+        return [self.items[item_id] for item_id in sorted(wasted, key=self.attribute_index.order.__getitem__)]
 
     def simulate_day(self, days: int = 1) -> None:
         self.current_date += timedelta(days=days)
         self.log_action("simulate_day", "", "system", {"days": days})
 
-        # Check for newly expired items
-        for item in self.items.values():
-            if item.is_expired(self.current_date) and not item.is_expired(self.current_date - timedelta(days=days)):
-                self.log_action("item_expired", item.id, "system")
+        # Check for newly expired items: expiry in [previous date, current date)
+        previous_date = self.current_date - timedelta(days=days)
+        for item_id in self.attribute_index.expiring(previous_date, self.current_date):
+            self.log_action("item_expired", item_id, "system")
 
     def log_action(self, action: str, item_id: str, user_id: str, details: Dict = None) -> None:
         log_entry = LogEntry(action, item_id, user_id)
@@ -0,0 +1,217 @@
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.models import Container, Item
+
+# Items stacked on one cell before the counter would wrap
+MAX_OVERLAP = np.iinfo(np.uint8).max
+
+# Distance field value of voxels with no path from the entrance (or further than a uint16 holds)
+UNREACHED = np.iinfo(np.uint16).max
+
+
+class OccupancyGrid:
+    """1 cm voxel grid of a container counting the items covering each cell
+
+    Axes are (x, y, z) = (width, height, depth) like item positions. Each
+    item's cells are remembered so it can be taken out again after its
+    position changed.
+    """
+
+    def __init__(self, width: int, height: int, depth: int):
+        self.cells = np.zeros((width, height, depth), dtype=np.uint8)
+        self.boxes: Dict[str, Tuple[slice, slice, slice]] = {}
+        # Container.version this grid reflects
+        self.version = 0
+        # voxel size -> occupied cell count per voxel, kept current on add and remove
+        self.levels: Dict[int, np.ndarray] = {}
+        # (voxel size, blocks of voxels) -> open faces between neighbouring blocks, see portals()
+        self._portals: Dict[Tuple[int, int], Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        # voxel size -> (version, steps from the entrance per voxel), see distance_field()
+        self._distances: Dict[int, Tuple[int, np.ndarray]] = {}
+        # voxel size -> version a retrieval path was last searched at instead of flooding, see optimize_retrieval
+        self.searched: Dict[int, int] = {}
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return self.cells.shape
+
+    def box(self, item: Item) -> Tuple[slice, slice, slice]:
+        """Cells covered by the item's full extent, clipped to the grid"""
+        low = (item.position.x, item.position.y, item.position.z)
+        size = (item.dimensions.width, item.dimensions.height, item.dimensions.depth)
+        return tuple(
+            slice(max(0, math.floor(start)), min(limit, math.ceil(start + length)))
+            for start, length, limit in zip(low, size, self.cells.shape)
+        )
+
+    def add(self, item: Item) -> None:
+        if item.position is None:
+            return
+        if item.id in self.boxes:
+            self.remove(item.id)
+        box = self.box(item)
+        region = self.cells[box]
+        np.add(region, 1, out=region, where=region < MAX_OVERLAP)
+        self.boxes[item.id] = box
+        self._refresh_levels(box)
+
+    def remove(self, item_id: str) -> None:
+        box = self.boxes.pop(item_id, None)
+        if box is not None:
+            region = self.cells[box]
+            np.subtract(region, 1, out=region, where=region > 0)
+            self._refresh_levels(box)
+
+    def blocked(self, x: int, y: int, z: int) -> bool:
+        return self.cells[x, y, z] > 0
+
+    def level(self, voxel: int) -> np.ndarray:
+        """Occupied cell count of every voxel x voxel x voxel block
+
+        Blocks along the far faces are clipped to the grid. Computed once
+        per voxel size, then updated block-wise as items come and go.
+        """
+        if voxel == 1:
+            return self.cells
+        if voxel not in self.levels:
+            self.levels[voxel] = _block_counts(self.cells, voxel)
+        return self.levels[voxel]
+
+    def portals(self, voxel: int, factor: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Open faces between neighbouring blocks of factor x factor x factor voxels
+
+        For each axis, entry [block] is True when that block and the next one
+        along the axis have a free voxel on either side of their shared
+        face, i.e. a path can cross from one to the other there.
+        """
+        key = (voxel, factor)
+        if key not in self._portals:
+            free = self.level(voxel) == 0
+            self._portals[key] = tuple(_axis_portals(free, factor, axis) for axis in range(3))
+        return self._portals[key]
+
+    def distance_field(self, voxel: int) -> np.ndarray:
+        """Steps from the open face (z = 0) to every free voxel, UNREACHED elsewhere
+
+        One breadth-first flood over level(voxel), stored as uint16 and
+        reused until the grid's version changes, so paths from the entrance
+        can be read off it without searching.
+        """
+        cached = self._distances.get(voxel)
+        if cached is None or cached[0] != self.version:
+            cached = (self.version, _entrance_distances(self.level(voxel) == 0))
+            self._distances[voxel] = cached
+        return cached[1]
+
+    def cached_distance_field(self, voxel: int) -> Optional[np.ndarray]:
+        """distance_field(voxel) if it is already current, None when reading it would flood first"""
+        cached = self._distances.get(voxel)
+        if cached is None or cached[0] != self.version:
+            return None
+        return cached[1]
+
+    def _refresh_levels(self, box: Tuple[slice, slice, slice]) -> None:
+        for voxel, counts in self.levels.items():
+            blocks = tuple(slice(axis.start // voxel, -(-axis.stop // voxel)) for axis in box)
+            region = tuple(slice(b.start * voxel, b.stop * voxel) for b in blocks)
+            counts[blocks] = _block_counts(self.cells[region], voxel)
+
+        for (voxel, factor), portals in self._portals.items():
+            # Recompute the faces of every block the box touches, plus the faces shared with the block before
+            level = self.level(voxel)
+            blocks = []
+            for axis, size in zip(box, level.shape):
+                first = axis.start // voxel // factor
+                last = -(-axis.stop // voxel) // factor
+                blocks.append((max(0, first - 1), min(last + 2, -(-size // factor))))
+            free = level[tuple(slice(low * factor, high * factor) for low, high in blocks)] == 0
+            for axis in range(3):
+                target = tuple(
+                    slice(low, high - 1) if a == axis else slice(low, high)
+                    for a, (low, high) in enumerate(blocks)
+                )
+                portals[axis][target] = _axis_portals(free, factor, axis)
+
+
+def _axis_portals(free: np.ndarray, factor: int, axis: int) -> np.ndarray:
+    """Per pair of neighbouring blocks along axis, whether some free voxel faces another across the boundary"""
+    free = np.moveaxis(free, axis, 0)
+    boundaries = np.arange(factor, free.shape[0], factor)
+    facing = free[boundaries - 1] & free[boundaries]
+
+    pad = [(0, 0)] + [(0, -size % factor) for size in facing.shape[1:]]
+    facing = np.pad(facing, pad)
+    k, h, d = facing.shape
+    open_faces = facing.reshape(k, h // factor, factor, d // factor, factor).any(axis=(2, 4))
+    return np.moveaxis(open_faces, 0, axis)
+
+
+def _entrance_distances(free: np.ndarray) -> np.ndarray:
+    """Breadth-first steps through free nodes from the open face, one ring at a time
+
+    Every free node on the z = 0 face is an entrance at distance 0, the same
+    open face retrieval plans clear items towards.
+    """
+    # Flat indexes into a copy padded with a blocked border, so neighbours need no bounds checks
+    padded_shape = tuple(size + 2 for size in free.shape)
+    open_nodes = np.pad(free, 1).ravel()
+    strides = (padded_shape[1] * padded_shape[2], padded_shape[2], 1)
+    offsets = np.array([sign * stride for stride in strides for sign in (1, -1)])
+    distances = np.full(open_nodes.size, UNREACHED, dtype=np.uint16)
+    # Per node, the position in the current ring's candidate list that claimed it
+    claimed = np.zeros(open_nodes.size, dtype=np.int64)
+
+    face = np.zeros(padded_shape, dtype=bool)
+    face[1:-1, 1:-1, 1] = free[:, :, 0]
+    frontier = np.flatnonzero(face)
+    distances[frontier] = 0
+    open_nodes[frontier] = False
+    distance = 0
+    while len(frontier) and distance < UNREACHED - 1:
+        candidates = (frontier[:, None] + offsets).ravel()
+        candidates = candidates[open_nodes[candidates]]
+
+        # Several ring nodes may reach the same neighbour; keep one copy
+        order = np.arange(len(candidates))
+        claimed[candidates] = order
+        frontier = candidates[claimed[candidates] == order]
+
+        distance += 1
+        distances[frontier] = distance
+        open_nodes[frontier] = False
+
+    return np.ascontiguousarray(distances.reshape(padded_shape)[1:-1, 1:-1, 1:-1])
+
+
+def _block_counts(cells: np.ndarray, voxel: int) -> np.ndarray:
+    """Occupied cells per voxel-sized block of cells, padding the far faces with free cells"""
+    occupied = cells > 0
+    pad = [(0, -size % voxel) for size in occupied.shape]
+    if any(after for _, after in pad):
+        occupied = np.pad(occupied, pad)
+    w, h, d = (size // voxel for size in occupied.shape)
+    blocks = occupied.reshape(w, voxel, h, voxel, d, voxel)
+    return blocks.sum(axis=(1, 3, 5), dtype=np.int32)
+
+
+def container_grid(container: Container) -> OccupancyGrid:
+    """The container's occupancy grid, built on first use and then kept current by Container
+
+    Rebuilt from scratch only if the container changed without going through
+    Container.add_item / remove_item.
+    """
+    grid = container.occupancy
+    if grid is None or grid.version != container.version:
+        grid = OccupancyGrid(
+            int(container.dimensions.width),
+            int(container.dimensions.height),
+            int(container.dimensions.depth)
+        )
+        for item in container.items:
+            grid.add(item)
+        grid.version = container.version
+        container.occupancy = grid
+    return grid
@@ -1,7 +1,19 @@
+import bisect
+import hashlib
+import itertools
+import json
+import math
 import numpy as np
+import os
 import random
-from typing import List, Tuple, Dict, Any
-from app.models import Item, Container, Position
+import tempfile
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from typing import List, Tuple, Dict, Any, Optional
+from app.models import CargoSystem, Item, Container, Position
 
 
 class GuilotineBin:
@@ -53,6 +65,222 @@ class GuilotineBin:
 
         return True, best_x, best_y, best_z
 
+    def copy(self):
+        """Clone the bin's free and used space so packing can continue independently"""
+        clone = GuilotineBin(self.width, self.height, self.depth)
+        clone.used_space = self.used_space.copy()
+        clone.free_rects = self.free_rects.copy()
+        return clone
+
+
+class MaximalSpaceBin:
+    """Maximal-space packing: free spaces may overlap and are indexed by size class and by position
+
+    Each free space is a (volume, x, y, z, w, h, d) tuple. For best-fit
+    lookups it sits in a bucket keyed by the power-of-two size class of its
+    three sides, sorted by (volume, x, y, z); for carving it is listed, with
+    its (x0, y0, z0, x1, y1, z1) bounds, in every cell of a coarse grid
+    (GRID_CELLS along the longest side) it overlaps.
+    """
+
+    GRID_CELLS = 8
+
+    def __init__(self, width, height, depth):
+        self.width = width
+        self.height = height
+        self.depth = depth
+        self.used_space = []
+        # free space -> its bounds
+        self.free_spaces: Dict[tuple, tuple] = {}
+        # width size class -> height size class -> depth size class -> free spaces of those classes, sorted
+        self.buckets: Dict[int, Dict[int, Dict[int, List[tuple]]]] = {}
+        # grid cell -> {free space overlapping it: its bounds}
+        self.cells: Dict[Tuple[int, int, int], Dict[tuple, tuple]] = {}
+        self.cell_size = max(width, height, depth, 1) / self.GRID_CELLS
+        self.grid_shape = tuple(-int(-side // self.cell_size) for side in (width, height, depth))
+        self.insert_count = 0
+        self.insert_time = 0.0
+        self._add_space((width * height * depth, 0, 0, 0, width, height, depth))
+
+    def insert(self, item_width, item_height, item_depth) -> Tuple[bool, float, float, float]:
+        """Place item in the smallest free space that fits it
+
+        Only buckets whose size classes are at least the item's are visited.
+        Where every class is larger, all of the bucket's spaces fit and its
+        first is its best; otherwise the bucket is walked from the item's
+        volume up to the first space that fits. Buckets whose smallest space
+        is no better than the best so far are skipped.
+        """
+        started = time.perf_counter()
+        self.insert_count += 1
+
+        cw, ch, cd = _size_class(item_width), _size_class(item_height), _size_class(item_depth)
+        volume = item_width * item_height * item_depth
+        best = None
+        for bw, by_height in self.buckets.items():
+            if bw < cw:
+                continue
+            for bh, by_depth in by_height.items():
+                if bh < ch:
+                    continue
+                for bd, spaces in by_depth.items():
+                    if bd < cd or (best is not None and spaces[0] >= best):
+                        continue
+                    if bw > cw and bh > ch and bd > cd:
+                        best = spaces[0]
+                        continue
+                    for position in range(bisect.bisect_left(spaces, (volume,)), len(spaces)):
+                        space = spaces[position]
+                        if best is not None and space >= best:
+                            break
+                        if space[4] >= item_width and space[5] >= item_height and space[6] >= item_depth:
+                            best = space
+                            break
+
+        if best is None:
+            self.insert_time += time.perf_counter() - started
+            return False, 0, 0, 0
+
+        _, x, y, z = best[:4]
+        self.occupy(x, y, z, item_width, item_height, item_depth)
+        self.insert_time += time.perf_counter() - started
+        return True, x, y, z
+
+    def occupy(self, x, y, z, width, height, depth) -> None:
+        """Mark a box as used, carving it out of every free space it intersects
+
+        Intersecting spaces come from the grid cells the box covers. Pieces
+        contained in another free space are dropped; any such space covers
+        the piece's low corner, so only that corner's cell is checked.
+        """
+        self.used_space.append((x, y, z, width, height, depth))
+        box = (x, y, z, x + width, y + height, z + depth)
+        _, _, _, x1, y1, z1 = box
+
+        hit = set()
+        for cell in self._cells_of(box):
+            for space, (sx0, sy0, sz0, sx1, sy1, sz1) in self.cells.get(cell, {}).items():
+                if sx0 < x1 and sx1 > x and sy0 < y1 and sy1 > y and sz0 < z1 and sz1 > z:
+                    hit.add(space)
+        if not hit:
+            return
+
+        for space in hit:
+            self._remove_space(space)
+        pieces = {piece for space in hit for piece in self._split(space, box)} - self.free_spaces.keys()
+
+        # Only a larger space can contain a piece, so going from the largest down, each
+        # piece is checked against every survivor that could contain it
+        for piece in sorted(pieces, reverse=True):
+            _, px, py, pz, pw, ph, pd = piece
+            candidates = self.cells.get(self._cell(px, py, pz), {}).values()
+            if not _covered((px, py, pz, px + pw, py + ph, pz + pd), candidates):
+                self._add_space(piece)
+
+    def _cell(self, x, y, z) -> Tuple[int, int, int]:
+        size = self.cell_size
+        return int(x // size), int(y // size), int(z // size)
+
+    def _cells_of(self, bounds):
+        """Grid cells overlapping the half-open box (x0, y0, z0, x1, y1, z1)"""
+        size = self.cell_size
+        x0, y0, z0, x1, y1, z1 = bounds
+        nx, ny, nz = self.grid_shape
+        return itertools.product(
+            range(max(0, int(x0 // size)), min(-int(-x1 // size), nx)),
+            range(max(0, int(y0 // size)), min(-int(-y1 // size), ny)),
+            range(max(0, int(z0 // size)), min(-int(-z1 // size), nz))
+        )
+
+    def _add_space(self, space) -> None:
+        _, x, y, z, w, h, d = space
+        bounds = (x, y, z, x + w, y + h, z + d)
+        self.free_spaces[space] = bounds
+        by_depth = self.buckets.setdefault(_size_class(w), {}).setdefault(_size_class(h), {})
+        bisect.insort(by_depth.setdefault(_size_class(d), []), space)
+        for cell in self._cells_of(bounds):
+            self.cells.setdefault(cell, {})[space] = bounds
+
+    def _remove_space(self, space) -> None:
+        bounds = self.free_spaces.pop(space)
+        bw, bh, bd = _size_class(space[4]), _size_class(space[5]), _size_class(space[6])
+        by_height = self.buckets[bw]
+        by_depth = by_height[bh]
+        spaces = by_depth[bd]
+        del spaces[bisect.bisect_left(spaces, space)]
+        if not spaces:
+            del by_depth[bd]
+            if not by_depth:
+                del by_height[bh]
+                if not by_height:
+                    del self.buckets[bw]
+        for cell in self._cells_of(bounds):
+            del self.cells[cell][space]
+
+    def copy(self):
+        """Clone the bin's free and used space so packing can continue independently"""
+        clone = MaximalSpaceBin.__new__(MaximalSpaceBin)
+        clone.__dict__.update(self.__dict__)
+        clone.used_space = self.used_space.copy()
+        clone.free_spaces = self.free_spaces.copy()
+        clone.buckets = {
+            bw: {bh: {bd: spaces.copy() for bd, spaces in by_depth.items()} for bh, by_depth in by_height.items()}
+            for bw, by_height in self.buckets.items()
+        }
+        clone.cells = {cell: spaces.copy() for cell, spaces in self.cells.items()}
+        return clone
+
+    def report(self) -> Dict[str, Any]:
+        """Free-space count and insert timing, for tuning and benchmarks"""
+        return {
+            "free_spaces": len(self.free_spaces),
+            "inserts": self.insert_count,
+            "avg_insert_ms": self.insert_time * 1000 / max(1, self.insert_count)
+        }
+
+    @staticmethod
+    def _split(space, box):
+        """Up to six maximal sub-spaces of space left over around box"""
+        _, x, y, z, w, h, d = space
+        min_x, min_y, min_z, max_x, max_y, max_z = box
+        pieces = []
+
+        if min_x > x:
+            pieces.append((x, y, z, min_x - x, h, d))
+        if max_x < x + w:
+            pieces.append((max_x, y, z, x + w - max_x, h, d))
+        if min_y > y:
+            pieces.append((x, y, z, w, min_y - y, d))
+        if max_y < y + h:
+            pieces.append((x, max_y, z, w, y + h - max_y, d))
+        if min_z > z:
+            pieces.append((x, y, z, w, h, min_z - z))
+        if max_z < z + d:
+            pieces.append((x, y, max_z, w, h, z + d - max_z))
+
+        return [(pw * ph * pd, px, py, pz, pw, ph, pd) for px, py, pz, pw, ph, pd in pieces]
+
+
+def _covered(bounds, candidates) -> bool:
+    """Whether any of the candidate (x0, y0, z0, x1, y1, z1) boxes contains bounds"""
+    x0, y0, z0, x1, y1, z1 = bounds
+    for ox0, oy0, oz0, ox1, oy1, oz1 in candidates:
+        if ox0 <= x0 and oy0 <= y0 and oz0 <= z0 and ox1 >= x1 and oy1 >= y1 and oz1 >= z1:
+            return True
+    return False
+
+
+def _size_class(side) -> int:
+    """Power-of-two class of a side length: sides in [2 ** (c - 1), 2 ** c) share class c"""
+    return math.frexp(side)[1]
+
+
+# Packing engines selectable by hybrid_placement and GA seeding
+PACKING_ENGINES = {
+    "guillotine": GuilotineBin,
+    "maximal_space": MaximalSpaceBin,
+}
+
 
 def fitness_function(placement_solution, containers, items, zones_priority):
     """Calculate fitness of a placement solution"""
@@ -120,6 +348,257 @@ def fitness_function(placement_solution, containers, items, zones_priority):
     return total_score
 
 
+# Upper bound on the number of item pairs compared in one vectorized block
+PAIR_BLOCK_SIZE = 1 << 22
+
+_DAY_US = timedelta(days=1) // timedelta(microseconds=1)
+
+
+class FitnessArrays:
+    """Item and container attributes precomputed once for batched fitness scoring"""
+
+    def __init__(self, containers, items):
+        self.n_containers = len(containers)
+        self.n_items = len(items)
+
+        # Dimensions are laid out as (width, height, depth) to line up with genes' (x, y, z)
+        self.item_dims = np.array(
+            [(i.dimensions.width, i.dimensions.height, i.dimensions.depth) for i in items],
+            dtype=float
+        ).reshape(-1, 3)
+        self.container_dims = np.array(
+            [(c.dimensions.width, c.dimensions.height, c.dimensions.depth) for c in containers],
+            dtype=float
+        ).reshape(-1, 3)
+        self.priority = np.array([item.priority for item in items], dtype=float)
+
+        # Per (item, container) terms: zone bonus and volume share
+        item_zones = np.array([item.preferred_zone for item in items], dtype=object)
+        container_zones = np.array([c.zone for c in containers], dtype=object)
+        zone_match = item_zones[:, None] == container_zones[None, :]
+        self.zone_bonus = np.where(zone_match, self.priority[:, None] * 10, 0.0)
+
+        item_volumes = np.array([item.dimensions.volume() for item in items], dtype=float)
+        container_volumes = np.array([c.dimensions.volume() for c in containers], dtype=float)
+        self.utilization = item_volumes[:, None] / container_volumes[None, :]
+
+        # Expiry dates as integer microseconds so day differences match timedelta.days exactly
+        reference = min((item.expiry_date for item in items), default=None)
+        self.expiry_us = np.array(
+            [(item.expiry_date - reference) // timedelta(microseconds=1) for item in items],
+            dtype=np.int64
+        )
+
+    def expiry_close(self, rows, cols):
+        """Whether abs((expiry[i] - expiry[j]).days) < 30 for every i in rows, j in cols"""
+        diff = self.expiry_us[rows][:, None] - self.expiry_us[cols][None, :]
+        # timedelta.days floors, so -30 < days < 30 is -29 days <= diff < 30 days
+        return (diff >= -29 * _DAY_US) & (diff < 30 * _DAY_US)
+
+
+def population_to_array(population, n_items):
+    """Stack a population of (container_idx, x, y, z) solutions into a (P, n, 4) array"""
+    return np.asarray(population, dtype=float).reshape(len(population), n_items, 4)
+
+
+def batch_fitness_function(population, arrays: FitnessArrays) -> np.ndarray:
+    """Score a whole population at once, matching fitness_function for every solution"""
+    genes = population if isinstance(population, np.ndarray) else population_to_array(population, arrays.n_items)
+    pop_size, n = genes.shape[0], genes.shape[1]
+
+    if n == 0:
+        return np.zeros(pop_size)
+    if arrays.n_containers == 0:
+        return np.full(pop_size, -1000.0)
+
+    container_idx = genes[..., 0].astype(np.intp)
+    low = genes[..., 1:]
+    high = low + arrays.item_dims
+
+    valid = (container_idx >= 0) & (container_idx < arrays.n_containers)
+    safe_idx = np.where(valid, container_idx, 0)
+    out_of_bounds = ~valid | np.any(high > arrays.container_dims[safe_idx], axis=-1)
+
+    # Pairwise terms, computed in blocks of item rows to bound memory
+    overlapping = np.zeros((pop_size, n), dtype=bool)
+    expiry_pairs = np.zeros(pop_size, dtype=np.int64)
+    row_block = max(1, min(n, PAIR_BLOCK_SIZE // n))
+    pop_block = max(1, PAIR_BLOCK_SIZE // (row_block * n))
+    all_items = np.arange(n)
+
+    for r0 in range(0, n, row_block):
+        r1 = min(n, r0 + row_block)
+        rows = all_items[r0:r1]
+        close = arrays.expiry_close(rows, all_items)
+
+        for p0 in range(0, pop_size, pop_block):
+            p1 = min(pop_size, p0 + pop_block)
+            same = container_idx[p0:p1, r0:r1, None] == container_idx[p0:p1, None, :]
+            same[:, rows - r0, rows] = False
+
+            expiry_pairs[p0:p1] += np.count_nonzero(same & close, axis=(1, 2))
+
+            hit = same & np.all(
+                (low[p0:p1, r0:r1, None, :] < high[p0:p1, None, :, :]) &
+                (high[p0:p1, r0:r1, None, :] > low[p0:p1, None, :, :]),
+                axis=-1
+            )
+            overlapping[p0:p1, r0:r1] = hit.any(axis=2)
+
+    # fitness_function stops at the first invalid item: -1000 for bounds, -2000 for overlap
+    invalid = out_of_bounds | overlapping
+    first_invalid = np.argmax(invalid, axis=1)
+    penalty = np.where(out_of_bounds[np.arange(pop_size), first_invalid], -1000.0, -2000.0)
+
+    priority_score = arrays.zone_bonus[all_items, safe_idx].sum(axis=1)
+    space_utilization = arrays.utilization[all_items, safe_idx].sum(axis=1)
+    access_score = (arrays.priority / (np.sqrt(low.sum(axis=-1)) + 1)).sum(axis=1)
+    expiry_score = expiry_pairs * 5
+
+    total_score = (
+            space_utilization * 100 +
+            priority_score * 50 +
+            expiry_score * 20 +
+            access_score * 30
+    )
+
+    return np.where(invalid.any(axis=1), penalty, total_score)
+
+
+class FitnessState:
+    """Per-gene fitness components of one solution, re-scored incrementally as genes change"""
+
+    def __init__(self, solution, arrays: FitnessArrays):
+        n = arrays.n_items
+        self.arrays = arrays
+        self.genes = np.array(solution, dtype=float).reshape(n, 4)
+        self.container_idx = self.genes[:, 0].astype(np.intp)
+
+        # Per-gene terms: bounds validity, zone bonus, access and volume share
+        self.out_of_bounds = np.zeros(n, dtype=bool)
+        self.zone = np.zeros(n)
+        self.access = np.zeros(n)
+        self.utilization = np.zeros(n)
+        self._score_genes(np.arange(n))
+
+        # Pair terms only exist within a container, so build them group by group
+        self.overlap_count = np.zeros(n, dtype=np.int64)
+        self.expiry_pairs = 0
+        for c_idx in np.unique(self.container_idx):
+            members = np.flatnonzero(self.container_idx == c_idx)
+            _, overlap, close = self._pair_terms(members, members)
+            self.overlap_count[members] = overlap.sum(axis=1)
+            self.expiry_pairs += int(np.count_nonzero(close))
+
+    def copy(self):
+        """Copy the cached components so a child can be derived without touching the parent"""
+        clone = FitnessState.__new__(FitnessState)
+        clone.arrays = self.arrays
+        clone.genes = self.genes.copy()
+        clone.container_idx = self.container_idx.copy()
+        clone.out_of_bounds = self.out_of_bounds.copy()
+        clone.zone = self.zone.copy()
+        clone.access = self.access.copy()
+        clone.utilization = self.utilization.copy()
+        clone.overlap_count = self.overlap_count.copy()
+        clone.expiry_pairs = self.expiry_pairs
+        return clone
+
+    def update(self, changed, new_genes):
+        """Replace the genes at `changed`, recomputing only the terms they take part in"""
+        changed = np.asarray(changed, dtype=np.intp)
+        if changed.size == 0:
+            return
+
+        self._apply_pair_terms(changed, -1)
+        self.genes[changed] = new_genes
+        self.container_idx[changed] = self.genes[changed, 0].astype(np.intp)
+        self._score_genes(changed)
+        self._apply_pair_terms(changed, 1)
+
+    def score(self) -> float:
+        """Fitness of the current genes, identical to fitness_function"""
+        invalid = self.out_of_bounds | (self.overlap_count > 0)
+        if invalid.any():
+            first_invalid = int(np.argmax(invalid))
+            return -1000.0 if self.out_of_bounds[first_invalid] else -2000.0
+
+        return float(
+            self.utilization.sum() * 100 +
+            self.zone.sum() * 50 +
+            self.expiry_pairs * 5 * 20 +
+            self.access.sum() * 30
+        )
+
+    def _score_genes(self, idx):
+        arrays = self.arrays
+        if arrays.n_containers == 0:
+            self.out_of_bounds[idx] = True
+            return
+
+        container_idx = self.container_idx[idx]
+        low = self.genes[idx, 1:]
+        valid = (container_idx >= 0) & (container_idx < arrays.n_containers)
+        safe_idx = np.where(valid, container_idx, 0)
+
+        self.out_of_bounds[idx] = ~valid | np.any(low + arrays.item_dims[idx] > arrays.container_dims[safe_idx], axis=-1)
+        self.zone[idx] = arrays.zone_bonus[idx, safe_idx]
+        self.utilization[idx] = arrays.utilization[idx, safe_idx]
+        self.access[idx] = arrays.priority[idx] / (np.sqrt(low.sum(axis=-1)) + 1)
+
+    def _pair_terms(self, rows, cols):
+        """Same-container, overlap and expiry-closeness masks between rows and cols"""
+        same = self.container_idx[rows][:, None] == self.container_idx[cols][None, :]
+        same &= rows[:, None] != cols[None, :]
+
+        low = self.genes[:, 1:]
+        high = low + self.arrays.item_dims
+        overlap = same & np.all(
+            (low[rows][:, None, :] < high[cols][None, :, :]) &
+            (high[rows][:, None, :] > low[cols][None, :, :]),
+            axis=-1
+        )
+        close = same & self.arrays.expiry_close(rows, cols)
+        return same, overlap, close
+
+    def _apply_pair_terms(self, changed, sign):
+        # Pair terms only link genes in the same container, so work one touched container at a time
+        changed_containers = self.container_idx[changed]
+        for c_idx in np.unique(changed_containers):
+            rows = changed[changed_containers == c_idx]
+            cols = np.flatnonzero(self.container_idx == c_idx)
+            same, overlap, close = self._pair_terms(rows, cols)
+            outside = ~np.isin(cols, changed)
+
+            # Ordered expiry pairs (changed, any) plus the reverse (unchanged, changed)
+            close_back = same[:, outside].T & self.arrays.expiry_close(cols[outside], rows)
+            self.expiry_pairs += sign * int(np.count_nonzero(close) + np.count_nonzero(close_back))
+
+            self.overlap_count[cols[outside]] += sign * overlap[:, outside].sum(axis=0)
+            if sign > 0:
+                self.overlap_count[rows] = overlap.sum(axis=1)
+
+
+def derive_fitness_state(child, parents):
+    """Build a child's FitnessState from the parent it differs from in the fewest genes"""
+    genes = np.array(child, dtype=float).reshape(-1, 4)
+
+    base, changed = None, None
+    for parent in parents:
+        diff = np.flatnonzero(np.any(genes != parent.genes, axis=1))
+        if changed is None or diff.size < changed.size:
+            base, changed = parent, diff
+
+    # A delta costs about two passes of changed genes x occupancy; past a full rebuild, rebuild
+    _, occupancy = np.unique(base.container_idx, return_counts=True)
+    if 2 * changed.size * occupancy.max(initial=0) >= np.square(occupancy).sum():
+        return FitnessState(genes, base.arrays)
+
+    state = base.copy()
+    state.update(changed, genes[changed])
+    return state
+
+
 def crossover(parent1, parent2):
     """Perform crossover between two parent solutions"""
     if not parent1 or not parent2:
@@ -150,38 +629,30 @@ def mutate(solution, containers, mutation_rate=0.1):
     return mutated
 
 
-def genetic_algorithm(containers, items, population_size=50, generations=100):
-    """Genetic algorithm for optimizing placement"""
+def seed_population(containers, items, population_size=50, packing_engine="guillotine"):
+    """Build an initial population of packed (see PACKING_ENGINES) and random solutions"""
     # Initialize population with guillotine cut solutions and random placements
     population = []
 
+    # One empty bin per container, cloned as each individual's live free-space state
+    bin_class = PACKING_ENGINES[packing_engine]
+    empty_bins = [
+        bin_class(container.dimensions.width, container.dimensions.height, container.dimensions.depth)
+        for container in containers
+    ]
+
     # Add guillotine cut solutions
     for _ in range(population_size // 2):
-        solution = []
-        remaining_items = items.copy()
-        random.shuffle(remaining_items)
+        solution = [None] * len(items)
+        bins = [bin.copy() for bin in empty_bins]
+        insertion_order = list(range(len(items)))
+        random.shuffle(insertion_order)
 
-        for item in remaining_items:
+        for item_idx in insertion_order:
+            item = items[item_idx]
             placed = False
-            for c_idx, container in enumerate(containers):
-                bin = GuilotineBin(
-                    container.dimensions.width,
-                    container.dimensions.height,
-                    container.dimensions.depth
-                )
-
-                # Try to place items that are already in the container
-                for i, existing_item in enumerate(solution):
-                    container_idx, x, y, z = existing_item
-                    if container_idx == c_idx:
-                        existing = items[i]
-                        bin.insert(
-                            existing.dimensions.width,
-                            existing.dimensions.height,
-                            existing.dimensions.depth
-                        )
-
-                # Try to place the new item
+            for c_idx, bin in enumerate(bins):
+                # The bin already holds every item placed in this container so far
                 success, x, y, z = bin.insert(
                     item.dimensions.width,
                     item.dimensions.height,
@@ -189,7 +660,7 @@ def genetic_algorithm(containers, items, population_size=50, generations=100):
                 )
 
                 if success:
-                    solution.append((c_idx, x, y, z))
+                    solution[item_idx] = (c_idx, x, y, z)
                     placed = True
                     break
 
@@ -199,7 +670,7 @@ def genetic_algorithm(containers, items, population_size=50, generations=100):
                     x = random.randint(0, int(container.dimensions.width - item.dimensions.width))
                     y = random.randint(0, int(container.dimensions.height - item.dimensions.height))
                     z = random.randint(0, int(container.dimensions.depth - item.dimensions.depth))
-                    solution.append((c_idx, x, y, z))
+                    solution[item_idx] = (c_idx, x, y, z)
                     break
 
         population.append(solution)
@@ -216,58 +687,413 @@ def genetic_algorithm(containers, items, population_size=50, generations=100):
             solution.append((c_idx, x, y, z))
         population.append(solution)
 
-    # Define zone priorities
-    zones_priority = {"A": 3, "B": 2, "C": 1}
+    return population
 
-    # Evolution loop
-    for generation in range(generations):
-        # Evaluate fitness
-        fitness_scores = [
-            fitness_function(solution, containers, items, zones_priority)
-            for solution in population
-        ]
 
+def iter_evolution(population, containers, arrays, incremental=True):
+    """Evolve a population indefinitely, yielding (population, fitness_scores) after each generation
+
+    The first yield is the scored starting population.
+    """
+    population_size = len(population)
+
+    if incremental:
+        states = [FitnessState(solution, arrays) for solution in population]
+        fitness_scores = [state.score() for state in states]
+    else:
+        fitness_scores = batch_fitness_function(population, arrays).tolist()
+
+    yield population, fitness_scores
+
+    # Evolution loop
+    while True:
         # Select parents using tournament selection
         def tournament_selection(k=3):
             indices = random.sample(range(len(population)), k)
-            return population[max(indices, key=lambda i: fitness_scores[i])]
+            return max(indices, key=lambda i: fitness_scores[i])
 
         # Create new population
         new_population = []
+        new_states = []
 
         # Elitism - keep the best solution
         elite_idx = fitness_scores.index(max(fitness_scores))
         new_population.append(population[elite_idx])
+        if incremental:
+            new_states.append(states[elite_idx])
 
         # Generate rest of the new population
         while len(new_population) < population_size:
             parent1 = tournament_selection()
             parent2 = tournament_selection()
 
-            child = crossover(parent1, parent2)
+            child = crossover(population[parent1], population[parent2])
             child = mutate(child, containers)
 
             new_population.append(child)
+            if incremental:
+                new_states.append(derive_fitness_state(child, (states[parent1], states[parent2])))
 
         population = new_population
 
+        # Evaluate fitness
+        if incremental:
+            states = new_states
+            fitness_scores = [state.score() for state in states]
+        else:
+            fitness_scores = batch_fitness_function(population, arrays).tolist()
+
+        yield population, fitness_scores
+
+
+def _run_until(evolution, generations, deadline=None, patience=None):
+    """Yield (generation, population, fitness_scores) until a generation, time or plateau limit
+
+    deadline is a time.time() timestamp; patience is the number of generations
+    the elite fitness may go without improving.
+    """
+    best_fitness = float('-inf')
+    stale = 0
+
+    for generation, (population, fitness_scores) in enumerate(evolution):
+        yield generation, population, fitness_scores
+
+        elite_fitness = max(fitness_scores)
+        if elite_fitness > best_fitness:
+            best_fitness = elite_fitness
+            stale = 0
+        else:
+            stale += 1
+
+        if generation >= generations:
+            break
+        if patience is not None and stale >= patience:
+            break
+        if deadline is not None and time.time() >= deadline:
+            break
+
+
+def evolve_population(population, containers, arrays, generations, incremental=True,
+                      deadline=None, patience=None):
+    """Run the evolution loop on an existing population, returning it with its fitness scores"""
+    fitness_scores = None
+    for _, population, fitness_scores in _run_until(
+            iter_evolution(population, containers, arrays, incremental), generations, deadline, patience):
+        pass
+
+    return population, fitness_scores
+
+
+def iter_genetic_algorithm(containers, items, population_size=50, generations=100, incremental=True,
+                           packing_engine="guillotine", time_budget=None, patience=None):
+    """Anytime genetic algorithm yielding (generation, best_solution, best_fitness) per generation
+
+    Stops after `generations`, once time_budget seconds have passed, or when
+    the elite fitness has not improved for `patience` generations, whichever
+    comes first. Callers can stop iterating early and keep the last yield.
+    """
+    deadline = time.time() + time_budget if time_budget is not None else None
+    population = seed_population(containers, items, population_size, packing_engine)
+
+    # Precompute item and container arrays for batched scoring
+    arrays = FitnessArrays(containers, items)
+
+    evolution = iter_evolution(population, containers, arrays, incremental)
+    for generation, population, fitness_scores in _run_until(evolution, generations, deadline, patience):
+        best_idx = fitness_scores.index(max(fitness_scores))
+        yield generation, population[best_idx], fitness_scores[best_idx]
+
+
+def genetic_algorithm(containers, items, population_size=50, generations=100, incremental=True,
+                      packing_engine="guillotine", time_budget=None, patience=None, callback=None):
+    """Genetic algorithm for optimizing placement
+
+    With incremental=True each offspring is scored by updating its closest
+    parent's cached FitnessState for the changed genes only. callback, if
+    given, receives (generation, best_solution, best_fitness) every generation.
+    """
+    best_solution = None
+    for generation, best_solution, best_fitness in iter_genetic_algorithm(
+            containers, items, population_size, generations, incremental,
+            packing_engine, time_budget, patience):
+        if callback:
+            callback(generation, best_solution, best_fitness)
+
     # Return the best solution
-    fitness_scores = [
-        fitness_function(solution, containers, items, zones_priority)
-        for solution in population
-    ]
-    best_idx = fitness_scores.index(max(fitness_scores))
+    return best_solution
+
+
+# Per-process state for island workers, set once by the pool initializer
+_island_context: Dict[str, Any] = {}
+
+
+def _init_island_worker(containers, items, incremental, packing_engine):
+    _island_context["containers"] = containers
+    _island_context["items"] = items
+    _island_context["arrays"] = FitnessArrays(containers, items)
+    _island_context["incremental"] = incremental
+    _island_context["packing_engine"] = packing_engine
+
+
+def _run_island_epoch(population, population_size, generations, seed, deadline=None, patience=None):
+    """Seed (first epoch) and evolve one island for a migration interval"""
+    random.seed(seed)
+    containers = _island_context["containers"]
+
+    if population is None:
+        population = seed_population(
+            containers, _island_context["items"], population_size, _island_context["packing_engine"]
+        )
+
+    return evolve_population(
+        population, containers, _island_context["arrays"], generations, _island_context["incremental"],
+        deadline, patience
+    )
+
+
+def _migrate(populations, fitness_scores, migrants):
+    """Ring migration: each island's elites replace the worst solutions of the next island"""
+    elites = []
+    for population, scores in zip(populations, fitness_scores):
+        ranked = sorted(range(len(population)), key=lambda i: scores[i], reverse=True)
+        elites.append([(population[i], scores[i]) for i in ranked[:migrants]])
+
+    for island_idx, (population, scores) in enumerate(zip(populations, fitness_scores)):
+        incoming = elites[island_idx - 1]
+        worst = sorted(range(len(population)), key=lambda i: scores[i])[:len(incoming)]
+        for slot, (solution, score) in zip(worst, incoming):
+            population[slot] = solution
+            scores[slot] = score
+
+
+def island_genetic_algorithm(containers, items, islands=4, workers=None, population_size=50,
+                             generations=100, migration_interval=10, migrants=2, seed=None,
+                             incremental=True, packing_engine="guillotine", time_budget=None, patience=None):
+    """Island-model genetic algorithm running one population per process
 
-    return population[best_idx]
+    Islands evolve independently for migration_interval generations, then
+    pass their best solutions around a ring. Each island reseeds the random
+    module from (seed, island, epoch) at every interval, so a given seed
+    gives the same result for any worker count. workers=1 runs in-process.
+    With a time_budget, islands stop evolving once it is spent (results then
+    depend on timing). With patience, an island ends its interval early once
+    its elite stops improving for that many generations, and the run ends
+    once the best fitness across islands has not improved for that many.
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    workers = workers or min(islands, os.cpu_count() or 1)
+    migration_interval = max(1, migration_interval)
+    deadline = time.time() + time_budget if time_budget is not None else None
 
+    populations = [None] * islands
+    fitness_scores = [None] * islands
+    initargs = (containers, items, incremental, packing_engine)
+
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_island_worker, initargs=initargs)
+    else:
+        pool = None
+        _init_island_worker(*initargs)
+
+    try:
+        remaining = generations
+        epoch = 0
+        best_fitness = float('-inf')
+        stale = 0
+        while True:
+            span = min(migration_interval, remaining)
+            tasks = [
+                (populations[i], population_size, span, f"{seed}:{i}:{epoch}", deadline, patience)
+                for i in range(islands)
+            ]
+            if pool:
+                results = list(pool.map(_run_island_epoch, *zip(*tasks)))
+            else:
+                results = [_run_island_epoch(*task) for task in tasks]
+
+            populations = [population for population, _ in results]
+            fitness_scores = [scores for _, scores in results]
+
+            remaining -= span
+            epoch += 1
+
+            elite_fitness = max(max(scores) for scores in fitness_scores)
+            if elite_fitness > best_fitness:
+                best_fitness = elite_fitness
+                stale = 0
+            else:
+                stale += span
+
+            if remaining <= 0 or (deadline is not None and time.time() >= deadline):
+                break
+            if patience is not None and stale >= patience:
+                break
+
+            _migrate(populations, fitness_scores, migrants)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    # Return the best solution across all islands
+    best_island = max(range(islands), key=lambda i: max(fitness_scores[i]))
+    scores = fitness_scores[best_island]
+    return populations[best_island][scores.index(max(scores))]
+
+
+class PlacementCache:
+    """LRU cache of placements keyed by an item-order independent manifest fingerprint
+
+    Solutions are stored against canonical (sorted) container and item slots,
+    so a repeat manifest with new item IDs or a different order maps back onto
+    the caller's own items. Solver settings are part of the key, so a manifest
+    solved with a smaller budget is not served to a caller asking for more.
+    With a directory, entries also persist as JSON.
+    """
+
+    def __init__(self, max_entries=128, directory: Optional[str] = None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.entries: "OrderedDict[str, List[Tuple[int, float, float, float]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def fingerprint(containers, items,
+                    settings: Optional[Dict[str, Any]] = None) -> Tuple[str, List[int], List[int]]:
+        """Hash of the manifest and solver settings, plus the canonical order of containers and items"""
+        container_keys = [
+            (c.dimensions.width, c.dimensions.height, c.dimensions.depth, c.zone) for c in containers
+        ]
+        item_keys = [
+            (i.dimensions.width, i.dimensions.height, i.dimensions.depth, i.priority, i.preferred_zone)
+            for i in items
+        ]
+        container_order = sorted(range(len(containers)), key=container_keys.__getitem__)
+        item_order = sorted(range(len(items)), key=item_keys.__getitem__)
+
+        payload = json.dumps([
+            [container_keys[i] for i in container_order],
+            [item_keys[i] for i in item_order],
+            settings or {}
+        ], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest(), container_order, item_order
+
+    def get(self, containers, items, settings: Optional[Dict[str, Any]] = None):
+        """Cached placements remapped onto these containers and items, or None"""
+        key, container_order, item_order = self.fingerprint(containers, items, settings)
+
+        solution = self.entries.get(key)
+        if solution is None:
+            solution = self._load(key)
+            if solution is not None:
+                self._remember(key, solution)
+        else:
+            self.entries.move_to_end(key)
+
+        if solution is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        placements = []
+        for slot, (container_slot, x, y, z) in enumerate(solution):
+            item = items[item_order[slot]]
+            container = containers[container_order[container_slot]]
+            placements.append((item, container.id, Position(x, y, z)))
+        return placements
+
+    def put(self, containers, items, placements, settings: Optional[Dict[str, Any]] = None) -> None:
+        """Store hybrid_placement-style (item, container_id, position) results"""
+        key, container_order, item_order = self.fingerprint(containers, items, settings)
+        container_slots = {containers[idx].id: slot for slot, idx in enumerate(container_order)}
+        item_slots = {id(items[idx]): slot for slot, idx in enumerate(item_order)}
+
+        solution = [None] * len(items)
+        for item, container_id, position in placements:
+            solution[item_slots[id(item)]] = (container_slots[container_id], position.x, position.y, position.z)
+
+        self._remember(key, solution)
+        if self.directory:
+            # Write a temporary file and rename it over the entry, so readers never see a partial file
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(solution, f)
+                os.replace(temp_path, os.path.join(self.directory, f"{key}.json"))
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.entries)
+        }
+
+    def _remember(self, key, solution):
+        self.entries[key] = solution
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _load(self, key):
+        """The persisted solution for key, or None if it is missing, unreadable or corrupt"""
+        if not self.directory:
+            return None
+        path = os.path.join(self.directory, f"{key}.json")
+        try:
+            with open(path) as f:
+                return [tuple(gene) for gene in json.load(f)]
+        except (OSError, ValueError, TypeError):
+            return None
+
+
+def hybrid_placement(containers, items, islands=1, workers=None, seed=None, migration_interval=10,
+                     packing_engine="guillotine", time_budget=None, patience=None,
+                     population_size=50, generations=100, cache: Optional[PlacementCache] = None):
+    """Combines Guillotine Cut with Genetic Algorithm for optimal placement
+
+    islands > 1 switches to the multi-process island model. packing_engine
+    picks the bin used to seed the population ("guillotine" or "maximal_space").
+    time_budget (seconds) and patience (plateau generations) stop the GA early.
+    A PlacementCache skips the GA for manifests it has already solved.
+    """
+    # Everything besides the manifest that changes the solution the GA converges to
+    settings = {
+        "packing_engine": packing_engine, "generations": generations, "population_size": population_size,
+        "islands": islands, "migration_interval": migration_interval, "time_budget": time_budget,
+        "patience": patience
+    }
+    if cache is not None:
+        cached = cache.get(containers, items, settings)
+        if cached is not None:
+            return cached, []
 
-def hybrid_placement(containers, items):
-    """Combines Guillotine Cut with Genetic Algorithm for optimal placement"""
     # Sort items by priority (descending)
     sorted_items = sorted(items, key=lambda x: x.priority, reverse=True)
 
     # Use genetic algorithm for placement
-    placement_solution = genetic_algorithm(containers, sorted_items)
+    if islands > 1:
+        placement_solution = island_genetic_algorithm(
+            containers, sorted_items, islands=islands, workers=workers,
+            population_size=population_size, generations=generations,
+            migration_interval=migration_interval, seed=seed, packing_engine=packing_engine,
+            time_budget=time_budget, patience=patience
+        )
+    else:
+        if seed is not None:
+            random.seed(seed)
+        placement_solution = genetic_algorithm(
+            containers, sorted_items, population_size, generations, packing_engine=packing_engine,
+            time_budget=time_budget, patience=patience
+        )
 
     # Convert solution to returnable format
     placements = []
@@ -280,4 +1106,79 @@ def hybrid_placement(containers, items):
 
         placements.append((item, container.id, position))
 
+    if cache is not None:
+        cache.put(containers, items, placements, settings)
+
     return placements, rearrangements
+
+
+# Free-space bins of live containers: container -> (bin, synced version, synced item count)
+_container_bins = weakref.WeakKeyDictionary()
+
+
+def container_free_space(container: Container) -> MaximalSpaceBin:
+    """Free space of a live container, with every placed item carved out as a fixed obstacle
+
+    The bin is cached per container. If the container only gained items since
+    the last call, just those are carved out; any other change rebuilds it.
+    """
+    cached = _container_bins.get(container)
+    if cached is not None:
+        bin, version, item_count = cached
+        appended = len(container.items) - item_count
+        if container.version - version == appended >= 0:
+            new_items = container.items[item_count:]
+        else:
+            cached = None
+
+    if cached is None:
+        bin = MaximalSpaceBin(container.dimensions.width, container.dimensions.height, container.dimensions.depth)
+        new_items = container.items
+
+    for item in new_items:
+        if item.position:
+            bin.occupy(
+                item.position.x, item.position.y, item.position.z,
+                item.dimensions.width, item.dimensions.height, item.dimensions.depth
+            )
+
+    _container_bins[container] = (bin, container.version, len(container.items))
+    return bin
+
+
+def place_new_items(cargo_system: CargoSystem, new_items: List[Item]):
+    """Place a batch of new arrivals around what is already stored
+
+    Existing placements are treated as fixed obstacles and only the new items
+    are packed, preferring containers in each item's zone. Placements are
+    committed through CargoSystem.place_item. Returns (placements, unplaced).
+    """
+    containers = list(cargo_system.containers.values())
+    placements = []
+    unplaced = []
+
+    # Highest priority items pick their spots first
+    for item in sorted(new_items, key=lambda x: x.priority, reverse=True):
+        if item.id not in cargo_system.items:
+            cargo_system.add_item(item)
+
+        candidates = sorted(containers, key=lambda c: c.zone != item.preferred_zone)
+        for container in candidates:
+            bin = container_free_space(container)
+            success, x, y, z = bin.insert(
+                item.dimensions.width,
+                item.dimensions.height,
+                item.dimensions.depth
+            )
+
+            if success:
+                position = Position(x, y, z)
+                cargo_system.place_item(item.id, container.id, position)
+                # The bin already holds this item, so mark it as synced
+                _container_bins[container] = (bin, container.version, len(container.items))
+                placements.append((item, container.id, position))
+                break
+        else:
+            unplaced.append(item)
+
+    return placements, unplaced
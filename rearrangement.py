@@ -1,10 +1,170 @@
 import random
-from typing import List, Tuple, Dict, Any
-from app.models import CargoSystem, Item, Container, Position
-
-
-def calculate_solution_cost(solution, cargo_system, new_items):
-    """Calculate cost of a rearrangement solution"""
+from typing import List, Tuple, Dict, Iterable, Optional, Set
+import numpy as np
+from app.models import CargoSystem, Item, Position
+from app.retrieval import container_rtree
+
+# Added cost of a move whose target box overlaps another item in the container
+COLLISION_PENALTY = 50
+
+
+def move_key(move) -> Tuple:
+    """Hashable (item_id, container_id, x, y, z) of a proposed move"""
+    item_id, container_id, position = move
+    return item_id, container_id, position.x, position.y, position.z
+
+
+def _target_box(item: Item, position: Position) -> Tuple[float, ...]:
+    return (position.x, position.y, position.z,
+            position.x + item.dimensions.width,
+            position.y + item.dimensions.height,
+            position.z + item.dimensions.depth)
+
+
+def _overlaps(box, other) -> bool:
+    """Whether two boxes share a positive volume; boxes that only touch do not"""
+    return (box[0] < other[3] and other[0] < box[3] and
+            box[1] < other[4] and other[1] < box[4] and
+            box[2] < other[5] and other[2] < box[5])
+
+
+def _record_overlaps(moves: Iterable, cargo_system: CargoSystem, new_by_id: Dict[str, Item],
+                     overlapping: Dict[Tuple, List[str]]) -> None:
+    """Store, by move key, the placed items each not yet seen move's target box overlaps
+
+    Unseen moves are grouped by container and each group is answered with
+    one batch query against the container's R-tree (see container_rtree).
+    This does not depend on the solution, so entries stay valid while the
+    containers do not change.
+    """
+    by_container: Dict[str, Dict[Tuple, Tuple[float, ...]]] = {}
+    for move in moves:
+        key = move_key(move)
+        item = cargo_system.items.get(move[0]) or new_by_id.get(move[0])
+        if key not in overlapping and item is not None and move[1] in cargo_system.containers:
+            by_container.setdefault(move[1], {})[key] = _target_box(item, move[2])
+
+    for container_id, boxes in by_container.items():
+        tree = container_rtree(cargo_system.containers[container_id])
+        for (key, box), others in zip(boxes.items(), tree.query_many(list(boxes.values()))):
+            # The query is closed, so touching items come back too
+            overlapping[key] = [other_id for other_id in others if _overlaps(box, tree.entry_bounds[other_id])]
+
+
+class CollisionState:
+    """Which moves of one solution collide, kept so neighbours changing a few moves are checked cheaply
+
+    A move's target box collides with the items the solution leaves where
+    they are and with the solution's other targets in the same container;
+    items it moves no longer occupy their old place. The targets' pairwise
+    overlaps are computed once, and a neighbour that moves the same items is
+    checked by comparing just its changed targets with the others in their
+    containers.
+    """
+
+    def __init__(self, solution, cargo_system: CargoSystem, new_items: List[Item],
+                 overlapping: Optional[Dict[Tuple, List[str]]] = None):
+        self.cargo_system = cargo_system
+        self.new_by_id = {item.id: item for item in new_items}
+        # move key -> placed items its target box overlaps, see _record_overlaps
+        self.overlapping = {} if overlapping is None else overlapping
+        self.moved = {move[0] for move in solution}
+
+        self.keys = [move_key(move) for move in solution]
+        rows = [self._row(move) for move in solution]
+        self.boxes = [box for _, box in rows]
+        self.by_container: Dict[str, List[int]] = {}
+        for index, (container_id, _) in enumerate(rows):
+            if container_id is not None:
+                self.by_container.setdefault(container_id, []).append(index)
+
+        # Indexes of the other targets each target overlaps, one pairwise pass per container
+        self.partners: List[Set[int]] = [set() for _ in solution]
+        for indexes in self.by_container.values():
+            boxes = np.array([self.boxes[index] for index in indexes], dtype=float)
+            pairs = ((boxes[:, None, :3] < boxes[None, :, 3:]) & (boxes[None, :, :3] < boxes[:, None, 3:])).all(axis=2)
+            np.fill_diagonal(pairs, False)
+            for row, column in zip(*np.nonzero(pairs)):
+                self.partners[indexes[row]].add(indexes[column])
+
+        self.fixed = self._fixed(solution, self.keys)
+        self.hit = {index for index, fixed in enumerate(self.fixed) if fixed or self.partners[index]}
+
+    def _row(self, move) -> Tuple[Optional[str], Tuple[float, ...]]:
+        """Container id (None if the move cannot be placed) and target box of a move"""
+        item_id, container_id, position = move
+        item = self.cargo_system.items.get(item_id) or self.new_by_id.get(item_id)
+        if item is None or container_id not in self.cargo_system.containers:
+            return None, (0.0,) * 6
+        return container_id, _target_box(item, position)
+
+    def _fixed(self, moves, keys) -> List[bool]:
+        """Whether each move's target box overlaps an item the solution leaves in place"""
+        if any(key not in self.overlapping for key in keys):
+            _record_overlaps(moves, self.cargo_system, self.new_by_id, self.overlapping)
+        return [any(other_id not in self.moved for other_id in self.overlapping.get(key, ())) for key in keys]
+
+    def colliding(self) -> Set[Tuple]:
+        """Keys (see move_key) of the solution's colliding moves"""
+        return {self.keys[index] for index in self.hit}
+
+    def neighbor_signature(self, neighbor, changed: List[int]) -> Tuple:
+        """solution_signature of neighbor, which differs from the solution at the changed indexes"""
+        keys = list(self.keys)
+        for index in changed:
+            keys[index] = move_key(neighbor[index])
+        return tuple(keys)
+
+    def neighbor_colliding(self, neighbor, changed: List[int]) -> Set[Tuple]:
+        """Keys of the colliding moves of neighbor, which differs from the solution at the changed indexes"""
+        if not changed:
+            return self.colliding()
+
+        moves = [neighbor[index] for index in changed]
+        keys = [move_key(move) for move in moves]
+        rows = [self._row(move) for move in moves]
+        fixed = self._fixed(moves, keys)
+
+        # Targets each changed move now overlaps: unchanged ones in its container, then the other changed ones
+        replaced = set(changed)
+        partners = [
+            {index for index in self.by_container.get(container_id, ())
+             if index not in replaced and _overlaps(box, self.boxes[index])}
+            for container_id, box in rows
+        ]
+        for i in range(len(rows)):
+            for j in range(i + 1, len(rows)):
+                if rows[i][0] is not None and rows[i][0] == rows[j][0] and _overlaps(rows[i][1], rows[j][1]):
+                    partners[i].add(changed[j])
+                    partners[j].add(changed[i])
+
+        # Only moves that overlapped an old or a new changed target can change state
+        hit = self.hit - replaced
+        affected = set().union(*(self.partners[index] for index in changed), *partners) - replaced
+        for index in affected:
+            if (self.fixed[index] or not self.partners[index] <= replaced or
+                    any(index in new_partners for new_partners in partners)):
+                hit.add(index)
+            else:
+                hit.discard(index)
+        hit.update(index for index, fixed_hit, new_partners in zip(changed, fixed, partners)
+                   if fixed_hit or new_partners)
+
+        changed_keys = dict(zip(changed, keys))
+        return {changed_keys.get(index) or self.keys[index] for index in hit}
+
+
+def colliding_moves(solution, cargo_system: CargoSystem, new_items: List[Item]) -> Set[Tuple]:
+    """Keys (see move_key) of the solution's moves whose target box overlaps another item, see CollisionState"""
+    return CollisionState(solution, cargo_system, new_items).colliding()
+
+
+def calculate_solution_cost(solution, cargo_system, new_items, collisions: Set[Tuple] = None):
+    """Calculate cost of a rearrangement solution
+
+    collisions holds the keys of the solution's colliding moves (see
+    colliding_moves); each one adds COLLISION_PENALTY.
+    """
     cost = 0
 
     # Count moves
@@ -37,6 +197,9 @@ def calculate_solution_cost(solution, cargo_system, new_items):
         else:
             cost += (5 - item.priority) * 3  # Increase cost for bad placements
 
+    if collisions:
+        cost += COLLISION_PENALTY * len(collisions)
+
     return cost
 
 
@@ -154,29 +317,54 @@ def get_neighbors(solution, cargo_system):
     return neighbors
 
 
+def solution_signature(solution) -> Tuple:
+    """Hashable signature of a solution, equal for solutions making the same moves"""
+    return tuple(move_key(move) for move in solution)
+
+
 def tabu_search(initial_solution, cargo_system, new_items, max_iterations=100, tabu_tenure=10):
     """Tabu search to optimize rearrangements"""
     current_solution = initial_solution
     best_solution = initial_solution
-    best_cost = calculate_solution_cost(initial_solution, cargo_system, new_items)
+
+    # Collision state of the current solution, and the placed items each target box seen so far overlaps
+    overlapping = {}
+    state = CollisionState(initial_solution, cargo_system, new_items, overlapping)
+    best_cost = calculate_solution_cost(initial_solution, cargo_system, new_items, state.colliding())
+
+    # solution_signature -> cost; swaps and container changes recur across iterations
+    costs = {solution_signature(initial_solution): best_cost}
 
     tabu_list = []
 
     for iteration in range(max_iterations):
-        # Generate neighbors
+        # Generate neighbors, noting which moves each one changed
         neighbors = get_neighbors(current_solution, cargo_system)
+        changes = [
+            [index for index, (move, current) in enumerate(zip(neighbor, current_solution)) if move is not current]
+            for neighbor in neighbors
+        ]
+
+        # Target boxes new this iteration go to the R-trees in one batch per container
+        _record_overlaps(
+            (neighbor[index] for neighbor, changed in zip(neighbors, changes) for index in changed),
+            cargo_system, state.new_by_id, overlapping
+        )
 
         # Evaluate neighbors
         best_neighbor = None
         best_neighbor_cost = float('inf')
 
-        for neighbor in neighbors:
+        for neighbor, changed in zip(neighbors, changes):
             # Skip if move is in tabu list
-            move_signature = str(neighbor)
+            move_signature = state.neighbor_signature(neighbor, changed)
             if move_signature in tabu_list:
                 continue
 
-            cost = calculate_solution_cost(neighbor, cargo_system, new_items)
+            cost = costs.get(move_signature)
+            if cost is None:
+                collisions = state.neighbor_colliding(neighbor, changed)
+                cost = costs[move_signature] = calculate_solution_cost(neighbor, cargo_system, new_items, collisions)
 
             # Aspiration criterion - accept tabu move if it's better than best solution
             if cost < best_cost and move_signature in tabu_list:
@@ -193,6 +381,7 @@ def tabu_search(initial_solution, cargo_system, new_items, max_iterations=100, t
 
         # Update current solution
         current_solution = best_neighbor
+        state = CollisionState(current_solution, cargo_system, new_items, overlapping)
 
         # Update best solution
         if best_neighbor_cost < best_cost:
@@ -200,7 +389,7 @@ def tabu_search(initial_solution, cargo_system, new_items, max_iterations=100, t
             best_cost = best_neighbor_cost
 
         # Update tabu list
-        tabu_list.append(str(current_solution))
+        tabu_list.append(state.neighbor_signature(current_solution, []))
         if len(tabu_list) > tabu_tenure:
             tabu_list.pop(0)
 
@@ -1,250 +1,66 @@
-from typing import List, Dict, Tuple, Any, Set
+from typing import List, Dict, Tuple, Any, Set, Optional, Callable
 import heapq
 import math
+import numpy as np
 from app.models import CargoSystem, Item, Container, Position
-
-
-class RTreeNode:
-    def __init__(self, bounds, is_leaf=True):
-        self.bounds = bounds  # (min_x, min_y, min_z, max_x, max_y, max_z)
-        self.is_leaf = is_leaf
-        self.entries = []  # For leaf: (bounds, item_id); For non-leaf: (bounds, child_node)
-
-
-class RTreeIndex:
-    def __init__(self, max_entries=5):
-        self.root = RTreeNode((0, 0, 0, 0, 0, 0), True)
-        self.max_entries = max_entries
-
-    def insert(self, item_id, bounds):
-        """Insert item with its 3D bounds"""
-        self._insert(self.root, item_id, bounds)
-
-    def _insert(self, node, item_id, bounds):
-        if node.is_leaf:
-            node.entries.append((bounds, item_id))
-            node.bounds = self._expand_bounds(node.bounds, bounds)
-
-            if len(node.entries) > self.max_entries:
-                self._split_node(node)
-        else:
-            # Choose best subtree
-            best_idx = self._choose_subtree(node, bounds)
-            child = node.entries[best_idx][1]
-
-            self._insert(child, item_id, bounds)
-
-            # Update parent bounds
-            node.entries[best_idx] = (child.bounds, child)
-            node.bounds = self._merge_all_bounds([entry[0] for entry in node.entries])
-
-    def _choose_subtree(self, node, bounds):
-        min_enlargement = float('inf')
-        best_idx = 0
-
-        for i, (child_bounds, _) in enumerate(node.entries):
-            enlarged = self._expand_bounds(child_bounds, bounds)
-            enlargement = self._calculate_volume(enlarged) - self._calculate_volume(child_bounds)
-
-            if enlargement < min_enlargement:
-                min_enlargement = enlargement
-                best_idx = i
-
-        return best_idx
-
-    def _split_node(self, node):
-        # Linear split
-        entries = node.entries
-        node.entries = []
-
-        # Choose seeds
-        min_margin = float('inf')
-        seed_idx1, seed_idx2 = 0, 0
-
-        for i in range(len(entries)):
-            for j in range(i + 1, len(entries)):
-                margin = self._calculate_margin(
-                    self._expand_bounds(entries[i][0], entries[j][0])
-                )
-                if margin < min_margin:
-                    min_margin = margin
-                    seed_idx1, seed_idx2 = i, j
-
-        # Create two groups
-        group1 = [entries[seed_idx1]]
-        group2 = [entries[seed_idx2]]
-
-        remaining = [entry for i, entry in enumerate(entries)
-                     if i != seed_idx1 and i != seed_idx2]
-
-        # Distribute remaining entries
-        while remaining:
-            if len(group1) >= self.max_entries // 2:
-                group2.extend(remaining)
-                break
-
-            if len(group2) >= self.max_entries // 2:
-                group1.extend(remaining)
-                break
-
-            # Choose next entry based on minimum enlargement
-            selected_idx = 0
-            selected_group = 1
-            min_diff = float('inf')
-
-            for i, entry in enumerate(remaining):
-                bounds1 = self._merge_all_bounds([e[0] for e in group1] + [entry[0]])
-                bounds2 = self._merge_all_bounds([e[0] for e in group2] + [entry[0]])
-
-                enlargement1 = self._calculate_volume(bounds1) - self._calculate_volume(
-                    self._merge_all_bounds([e[0] for e in group1])
-                )
-
-                enlargement2 = self._calculate_volume(bounds2) - self._calculate_volume(
-                    self._merge_all_bounds([e[0] for e in group2])
-                )
-
-                diff = abs(enlargement1 - enlargement2)
-
-                if diff < min_diff:
-                    min_diff = diff
-                    selected_idx = i
-                    selected_group = 1 if enlargement1 < enlargement2 else 2
-
-            if selected_group == 1:
-                group1.append(remaining[selected_idx])
-            else:
-                group2.append(remaining[selected_idx])
-
-            remaining.pop(selected_idx)
-
-        # Create new nodes
-        if node.is_leaf:
-            node1 = RTreeNode(self._merge_all_bounds([e[0] for e in group1]), True)
-            node2 = RTreeNode(self._merge_all_bounds([e[0] for e in group2]), True)
-
-            node1.entries = group1
-            node2.entries = group2
-        else:
-            node1 = RTreeNode(self._merge_all_bounds([e[0] for e in group1]), False)
-            node2 = RTreeNode(self._merge_all_bounds([e[0] for e in group2]), False)
-
-            node1.entries = group1
-            node2.entries = group2
-
-        # Update parent or create new root
-        if node == self.root:
-            new_root = RTreeNode(
-                self._merge_all_bounds([node1.bounds, node2.bounds]),
-                False
-            )
-            new_root.entries = [(node1.bounds, node1), (node2.bounds, node2)]
-            self.root = new_root
-
-        return (node1, node2)
-
-    def query(self, bounds):
-        """Query items within or intersecting bounds"""
-        result = []
-        self._query(self.root, bounds, result)
-        return result
-
-    def _query(self, node, bounds, result):
-        if not self._intersects(node.bounds, bounds):
-            return
-
-        if node.is_leaf:
-            for entry_bounds, item_id in node.entries:
-                if self._intersects(entry_bounds, bounds):
-                    result.append(item_id)
-        else:
-            for _, child in node.entries:
-                self._query(child, bounds, result)
-
-    def _expand_bounds(self, bounds1, bounds2):
-        """Expand bounds1 to include bounds2"""
-        min_x1, min_y1, min_z1, max_x1, max_y1, max_z1 = bounds1
-        min_x2, min_y2, min_z2, max_x2, max_y2, max_z2 = bounds2
-
-        return (
-            min(min_x1, min_x2),
-            min(min_y1, min_y2),
-            min(min_z1, min_z2),
-            max(max_x1, max_x2),
-            max(max_y1, max_y2),
-            max(max_z1, max_z2)
-        )
-
-    def _merge_all_bounds(self, bounds_list):
-        """Merge multiple bounds"""
-        if not bounds_list:
-            return (0, 0, 0, 0, 0, 0)
-
-        result = bounds_list[0]
-        for bounds in bounds_list[1:]:
-            result = self._expand_bounds(result, bounds)
-
-        return result
-
-    def _calculate_volume(self, bounds):
-        """Calculate volume of bounds"""
-        min_x, min_y, min_z, max_x, max_y, max_z = bounds
-        return max(0, max_x - min_x) * max(0, max_y - min_y) * max(0, max_z - min_z)
-
-    def _calculate_margin(self, bounds):
-        """Calculate margin (sum of edge lengths) of bounds"""
-        min_x, min_y, min_z, max_x, max_y, max_z = bounds
-        return (max_x - min_x) + (max_y - min_y) + (max_z - min_z)
-
-    def _intersects(self, bounds1, bounds2):
-        """Check if two bounds intersect"""
-        min_x1, min_y1, min_z1, max_x1, max_y1, max_z1 = bounds1
-        min_x2, min_y2, min_z2, max_x2, max_y2, max_z2 = bounds2
-
-        return (
-                min_x1 <= max_x2 and max_x1 >= min_x2 and
-                min_y1 <= max_y2 and max_y1 >= min_y2 and
-                min_z1 <= max_z2 and max_z1 >= min_z2
-        )
-
-
-def a_star_3d(start, goal, obstacles, dimensions):
-    """3D A* pathfinding to navigate to an item"""
-    # Create a simple grid for navigation
-    width, height, depth = dimensions
-    grid = [[[0 for _ in range(depth)] for _ in range(height)] for _ in range(width)]
-
-    # Mark obstacles in the grid
-    for obstacle in obstacles:
-        ox, oy, oz = obstacle
-        grid[ox][oy][oz] = 1
-
-    # Define valid moves (6-connected in 3D)
-    moves = [
-        (1, 0, 0), (-1, 0, 0),
-        (0, 1, 0), (0, -1, 0),
-        (0, 0, 1), (0, 0, -1)
-    ]
-
-    # A* implementation
-    open_set = []
-    closed_set = set()
-    g_score = {}
-    f_score = {}
+from app.occupancy import UNREACHED, OccupancyGrid, container_grid
+from app.rtree import ArrayRTreeIndex
+
+
+# Cells per side of the finest level optimize_retrieval plans on by default
+FINE_LEVEL_CELLS = 100
+
+# Blocks per side of the coarsest level hierarchical_path searches without a plan to follow
+TOP_LEVEL_BLOCKS = 16
+
+# Valid moves (6-connected in 3D)
+MOVES = (
+    (1, 0, 0), (-1, 0, 0),
+    (0, 1, 0), (0, -1, 0),
+    (0, 0, 1), (0, 0, -1)
+)
+
+
+def _grid_a_star(counts, limit, start, goal, passable=None, corridor=None, scale=1, goal_scale=1,
+                 portals=None, closed_edges=None):
+    """A* over a grid of per-node occupied counts, returning the node path or []
+
+    A node is open when its count is below limit or it lies inside the
+    passable box (node slices). With a corridor, a set of coarse cells, only
+    nodes whose node // scale cell is in it are searched. The search ends at
+    any node whose node // goal_scale is goal, so a whole block can be the
+    target. With portals (see OccupancyGrid.portals) a step is also only
+    allowed across an open face, unless it leaves or enters the passable box,
+    and never across the (lower node, axis) faces in closed_edges. Stale heap
+    entries are skipped when popped instead of being searched for on every
+    push, and equal-f ties go to the deeper node so open space is crossed
+    greedily.
+    """
+    width, height, depth = counts.shape
+    low = tuple(axis * goal_scale for axis in goal)
+    high = tuple(axis + goal_scale - 1 for axis in low)
+
+    def distance_to_goal(node):
+        return sum(max(lo - axis, 0, axis - hi) for axis, lo, hi in zip(node, low, high))
+
+    def in_passable(x, y, z):
+        return (passable is not None
+                and passable[0].start <= x < passable[0].stop
+                and passable[1].start <= y < passable[1].stop
+                and passable[2].start <= z < passable[2].stop)
+
+    g_score = {start: 0}
     came_from = {}
-
-    start_tuple = (start.x, start.y, start.z)
-    goal_tuple = (goal.x, goal.y, goal.z)
-
-    g_score[start_tuple] = 0
-    f_score[start_tuple] = heuristic(start_tuple, goal_tuple)
-
-    heapq.heappush(open_set, (f_score[start_tuple], start_tuple))
+    closed_set = set()
+    open_set = [(distance_to_goal(start), 0, start)]
 
     while open_set:
-        _, current = heapq.heappop(open_set)
+        _, _, current = heapq.heappop(open_set)
+        if current in closed_set:
+            continue
 
-        if current == goal_tuple:
+        cx, cy, cz = current
+        if (cx // goal_scale, cy // goal_scale, cz // goal_scale) == goal:
             # Reconstruct path
             path = [current]
             while current in came_from:
@@ -252,46 +68,276 @@ def a_star_3d(start, goal, obstacles, dimensions):
                 path.append(current)
 
             path.reverse()
-            return [Position(x, y, z) for x, y, z in path]
+            return path
 
         closed_set.add(current)
+        tentative_g = g_score[current] + 1
 
-        cx, cy, cz = current
-        for dx, dy, dz in moves:
+        for axis, (dx, dy, dz) in zip((0, 0, 1, 1, 2, 2), MOVES):
             nx, ny, nz = cx + dx, cy + dy, cz + dz
 
             if not (0 <= nx < width and 0 <= ny < height and 0 <= nz < depth):
                 continue
 
-            if grid[nx][ny][nz] == 1:
+            neighbor = (nx, ny, nz)
+            if neighbor in closed_set:
                 continue
 
-            neighbor = (nx, ny, nz)
+            if corridor is not None and (nx // scale, ny // scale, nz // scale) not in corridor:
+                continue
 
-            if neighbor in closed_set:
+            if counts[nx, ny, nz] >= limit and not in_passable(nx, ny, nz):
                 continue
 
-            tentative_g = g_score[current] + 1
+            if portals is not None:
+                lower = min(current, neighbor)
+                if closed_edges and (lower, axis) in closed_edges:
+                    continue
+                if not portals[axis][lower] and not (in_passable(cx, cy, cz) or in_passable(nx, ny, nz)):
+                    continue
 
-            if neighbor not in g_score or tentative_g < g_score[neighbor]:
+            if tentative_g < g_score.get(neighbor, math.inf):
                 came_from[neighbor] = current
                 g_score[neighbor] = tentative_g
-                f_score[neighbor] = tentative_g + heuristic(neighbor, goal_tuple)
-
-                if all(item[1] != neighbor for item in open_set):
-                    heapq.heappush(open_set, (f_score[neighbor], neighbor))
+                heapq.heappush(open_set, (tentative_g + distance_to_goal(neighbor), -tentative_g, neighbor))
 
     # No path found
     return []
 
 
+def a_star_3d(start, goal, grid: OccupancyGrid, passable=None):
+    """3D A* pathfinding to navigate to an item at 1 cm resolution
+
+    Cells covered in grid are obstacles, except inside the passable box
+    (a tuple of slices, typically the target item's own cells).
+    """
+    shape = grid.cells.shape
+    path = _grid_a_star(grid.cells, 1, _node(start, 1, shape), _node(goal, 1, shape), passable)
+    return [Position(x, y, z) for x, y, z in path]
+
+
+def _node(position: Position, voxel: int, shape) -> Tuple[int, int, int]:
+    return tuple(
+        min(max(0, int(coordinate) // voxel), size - 1)
+        for coordinate, size in zip((position.x, position.y, position.z), shape)
+    )
+
+
+def _scale_box(box, voxel: int):
+    return tuple(slice(axis.start // voxel, -(-axis.stop // voxel)) for axis in box)
+
+
+def _refine_path(grid: OccupancyGrid, voxel: int, factor: int, depth: int, top: int,
+                 start, goal, passable, max_replans: int):
+    """Node path from start to goal at level depth, where nodes are blocks of factor ** depth voxels
+
+    Plans one level up first (down to the flat search at the top level) and
+    refines that plan one upper block at a time.
+    """
+    size = voxel * factor ** depth
+    counts = grid.level(size)
+    # A voxel is only walkable when completely free; a block as long as it is not completely full
+    limit = size ** 3 if depth else 1
+    portals = grid.portals(voxel, factor ** depth) if depth else None
+    node_passable = _scale_box(passable, size) if passable is not None else None
+
+    if depth == top:
+        return _grid_a_star(counts, limit, start, goal, node_passable, portals=portals)
+
+    upper_size = size * factor
+    upper_counts = grid.level(upper_size)
+    upper_portals = grid.portals(voxel, factor ** (depth + 1))
+    upper_passable = _scale_box(passable, upper_size) if passable is not None else None
+    upper_goal = tuple(axis // factor for axis in goal)
+
+    # Every path here maps onto one a level up, so no upper path means no path at all
+    upper_path = _refine_path(grid, voxel, factor, depth + 1, top,
+                              tuple(axis // factor for axis in start), upper_goal, passable, max_replans)
+    if not upper_path:
+        return []
+
+    nodes = [start]
+    plan = upper_path
+    closed_edges = set()
+    i = 1
+    while True:
+        if i >= len(plan) - 1:
+            target, target_scale = goal, 1
+        else:
+            target, target_scale = plan[i], factor
+
+        window = {plan[i - 1], plan[min(i, len(plan) - 1)]}
+        segment = _grid_a_star(counts, limit, nodes[-1], target, node_passable, window, factor, target_scale,
+                               portals)
+        if segment:
+            nodes.extend(segment[1:])
+            if target_scale == 1:
+                return nodes
+            i += 1
+            continue
+
+        # No way from here into the next upper block: close that face and replan from this block
+        if len(plan) == 1 or len(closed_edges) == max_replans:
+            break
+        current, following = plan[i - 1], plan[i]
+        axis = next(a for a in range(3) if current[a] != following[a])
+        closed_edges.add((min(current, following), axis))
+        plan = _grid_a_star(upper_counts, upper_size ** 3, current, upper_goal, upper_passable,
+                            portals=upper_portals, closed_edges=closed_edges)
+        if not plan:
+            break
+        i = 1
+
+    corridor = {
+        (x + dx, y + dy, z + dz)
+        for x, y, z in upper_path
+        for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)
+    }
+    nodes = _grid_a_star(counts, limit, start, goal, node_passable, corridor, factor, portals=portals)
+    if not nodes:
+        nodes = _grid_a_star(counts, limit, start, goal, node_passable, portals=portals)
+    return nodes
+
+
+def hierarchical_path(start: Position, goal: Position, grid: OccupancyGrid, passable=None,
+                      voxel: int = 1, coarse_factor: int = 4, max_replans: int = 16) -> List[Position]:
+    """Coarse-to-fine A*: plan over nested blocks, refining each plan near the level above
+
+    The path moves in voxel-sized steps and treats a voxel as free only if
+    all its cells are. Above it sit levels of blocks, each coarse_factor
+    times larger per side than the one below, up to a top level of about
+    TOP_LEVEL_BLOCKS per side that is searched outright. A block is passable
+    unless completely full and is only left through a face where free voxels
+    meet (OccupancyGrid.portals).
+
+    Each level's plan is refined one block at a time, searching only the
+    block it is in and the next one, so the work grows with the path length
+    rather than the container volume. When a step finds no way into the next
+    block, that face is closed and the rest of the plan replanned, up to
+    max_replans times per level; after that the level searches the whole
+    corridor around the plan at once, and only if that fails too everything.
+    """
+    fine = grid.level(voxel)
+    top = 0
+    while max(fine.shape) > TOP_LEVEL_BLOCKS * coarse_factor ** top:
+        top += 1
+
+    nodes = _refine_path(grid, voxel, coarse_factor, 0, top, _node(start, voxel, fine.shape),
+                         _node(goal, voxel, fine.shape), passable, max_replans)
+    if not nodes:
+        return []
+
+    path = [Position(x * voxel, y * voxel, z * voxel) for x, y, z in nodes]
+    # The last voxel holds the goal; end exactly on it
+    path[-1] = Position(goal.x, goal.y, goal.z)
+    return path
+
+
 def heuristic(a, b):
     """Manhattan distance heuristic for A*"""
     return abs(a[0] - b[0]) + abs(a[1] - b[1]) + abs(a[2] - b[2])
 
 
-def optimize_retrieval(item_id: str, cargo_system: CargoSystem):
-    """Use R-tree to locate item and A* to find optimal retrieval path"""
+def field_path(field: np.ndarray, box, goal) -> List[Tuple[int, int, int]]:
+    """Shortest node path from the entrance to goal read off an entrance distance field, or []
+
+    box (node slices) holds the target's own nodes, walkable only to reach
+    it. The path enters the box from the nearest node next to one of its
+    faces, traced back to the open face by stepping to a neighbour one step
+    closer each time, then walks straight to goal; nothing is searched. A
+    box on the open face itself can also be entered straight from outside.
+    """
+    low = np.array([axis.start for axis in box])
+    high = np.array([axis.stop - 1 for axis in box])
+    ranges = [np.arange(max(lo - 1, 0), min(hi + 2, size)) for lo, hi, size in zip(low, high, field.shape)]
+    nodes = np.stack(np.meshgrid(*ranges, indexing="ij"), axis=-1).reshape(-1, 3)
+    inside = np.clip(nodes, low, high)
+    steps_in = np.abs(nodes - inside).sum(axis=1)
+    distances = field[tuple(nodes.T)].astype(np.int64)
+
+    # Reached nodes next to one of its faces, or its own nodes on the open face
+    from_face = (steps_in == 0) & (nodes[:, 2] == 0)
+    distances[from_face] = 0
+    entries = ((steps_in == 1) & (distances < UNREACHED)) | from_face
+    if not entries.any():
+        return []
+    lengths = np.where(entries, distances + steps_in + np.abs(inside - goal).sum(axis=1), np.iinfo(np.int64).max)
+    entry = int(np.argmin(lengths))
+
+    node = tuple(int(axis) for axis in nodes[entry])
+    path = [node]
+    for distance in range(int(distances[entry]) - 1, -1, -1):
+        x, y, z = node
+        for dx, dy, dz in MOVES:
+            neighbor = (x + dx, y + dy, z + dz)
+            if all(0 <= axis < size for axis, size in zip(neighbor, field.shape)) and field[neighbor] == distance:
+                node = neighbor
+                break
+        path.append(node)
+    path.reverse()
+
+    # Step into the box, then straight to the goal one axis at a time
+    current = list(path[-1])
+    for waypoint in (tuple(int(axis) for axis in inside[entry]), tuple(goal)):
+        for axis in range(3):
+            while current[axis] != waypoint[axis]:
+                current[axis] += 1 if waypoint[axis] > current[axis] else -1
+                path.append(tuple(current))
+    return path
+
+
+def entrance_path(grid: OccupancyGrid, item: Item, voxel: int) -> List[Position]:
+    """Shortest voxel-step path from the open face (z = 0) to a placed item, or [] if it cannot be reached
+
+    Read off the grid's cached entrance distance field (see
+    OccupancyGrid.distance_field), so only the first path after the
+    contents change pays for a flood.
+    """
+    if item.id not in grid.boxes:
+        return []
+
+    field = grid.distance_field(voxel)
+    nodes = field_path(field, _scale_box(grid.boxes[item.id], voxel), _node(item.position, voxel, field.shape))
+    path = [Position(x * voxel, y * voxel, z * voxel) for x, y, z in nodes]
+    if path:
+        # The last voxel holds the item; end exactly on it
+        path[-1] = Position(item.position.x, item.position.y, item.position.z)
+    return path
+
+
+def face_entrance(grid: OccupancyGrid, box, voxel: int) -> Optional[Position]:
+    """The free voxel on the open face (z = 0) nearest the box's footprint, or None if the face is full
+
+    box is the target's cell slices; its own voxels on the face count as
+    free, since the path may end there.
+    """
+    free = grid.level(voxel)[:, :, 0] == 0
+    nodes = _scale_box(box, voxel)
+    if nodes[2].start == 0:
+        free[nodes[0], nodes[1]] = True
+    if not free.any():
+        return None
+
+    xs, ys = np.nonzero(free)
+    gaps = (np.maximum(nodes[0].start - xs, 0) + np.maximum(xs - (nodes[0].stop - 1), 0)
+            + np.maximum(nodes[1].start - ys, 0) + np.maximum(ys - (nodes[1].stop - 1), 0))
+    nearest = int(np.argmin(gaps))
+    return Position(int(xs[nearest]) * voxel, int(ys[nearest]) * voxel, 0)
+
+
+def optimize_retrieval(item_id: str, cargo_system: CargoSystem, voxel: Optional[int] = None,
+                       coarse_factor: int = 4):
+    """Find a retrieval path from the container's open face (z = 0) to the item
+
+    voxel is the path resolution in cm; by default it grows with the
+    container so the finest level stays around FINE_LEVEL_CELLS per side.
+    The first read after the container changes is planned with
+    hierarchical_path from the nearest free voxel on the open face, so it
+    costs a search bounded by the path rather than a flood of the whole
+    container. A second read before the next change floods the entrance
+    distance field, which then serves every read without searching (see
+    entrance_path).
+    """
     if item_id not in cargo_system.items:
         return []
 
@@ -302,35 +348,198 @@ def optimize_retrieval(item_id: str, cargo_system: CargoSystem):
 
     container = cargo_system.containers[item.container_id]
 
-    # Create R-tree index for all items in the container
-    rtree = RTreeIndex()
-    obstacles = []
-
-    for i in container.items:
-        if i.id != item_id and i.position:
-            bounds = (
-                i.position.x,
-                i.position.y,
-                i.position.z,
-                i.position.x + i.dimensions.width,
-                i.position.y + i.dimensions.height,
-                i.position.z + i.dimensions.depth
-            )
-            rtree.insert(i.id, bounds)
-            obstacles.append((int(i.position.x), int(i.position.y), int(i.position.z)))
-
-    # Define start and goal positions
-    start = Position(0, 0, 0)  # Container entrance
-    goal = item.position
-
-    dimensions = (
-        int(container.dimensions.width),
-        int(container.dimensions.height),
-        int(container.dimensions.depth)
-    )
+    grid = container_grid(container)
+    if voxel is None:
+        voxel = max(1, math.ceil(max(grid.shape) / FINE_LEVEL_CELLS))
 
-    # Use A* to find path
-    path = a_star_3d(start, goal, obstacles, dimensions)
+    box = grid.boxes.get(item_id)
+    if box is None:
+        return []
+
+    # The target's own cells are walkable so the path can end at its corner
+    if grid.cached_distance_field(voxel) is None and grid.searched.get(voxel) != grid.version:
+        grid.searched[voxel] = grid.version
+        start = face_entrance(grid, box, voxel)
+        path = hierarchical_path(start, item.position, grid, box, voxel, coarse_factor) if start else []
+    else:
+        path = entrance_path(grid, item, voxel)
 
     # Convert to API response format
     return [pos.to_dict() for pos in path]
+
+
+def container_rtree(container: Container) -> ArrayRTreeIndex:
+    """The container's R-tree over placed item boxes, bulk loaded on first use and then kept current by Container
+
+    Rebuilt from scratch only if the container changed without going through
+    Container.add_item / remove_item.
+    """
+    tree = container.rtree
+    if tree is None or tree.version != container.version:
+        tree = ArrayRTreeIndex.bulk_load([(item.id, item.bounds()) for item in container.items if item.position])
+        tree.version = container.version
+        container.rtree = tree
+    return tree
+
+
+def blocking_items(item: Item, tree: ArrayRTreeIndex, items: Dict[str, Item]) -> List[Item]:
+    """Items between item and the container's open face (z = 0), nearest the face first
+
+    These are the items overlapping the item's width x height footprint
+    swept from the open face to the item's front.
+    """
+    x0, y0, z0, x1, y1, _ = item.bounds()
+    blockers = []
+    for other_id in tree.query((x0, y0, 0, x1, y1, z0)):
+        other = items[other_id]
+        if other is item:
+            continue
+        ox0, oy0, oz0, ox1, oy1, _ = other.bounds()
+        # The query box is closed; only a real overlap in front of the item blocks it
+        if ox0 < x1 and ox1 > x0 and oy0 < y1 and oy1 > y0 and oz0 < z0:
+            blockers.append(other)
+
+    blockers.sort(key=lambda other: (other.position.z, other.id))
+    return blockers
+
+
+def items_near(cargo_system: CargoSystem, container_id: str, position: Position, k: int = 5,
+               predicate: Optional[Callable[[Item], bool]] = None) -> List[Tuple[Item, float]]:
+    """The k items in a container closest to a point inside it, as (item, distance), nearest first
+
+    Distances are to the nearest point of each item's box, so position (0, 0, 0)
+    ranks items by how close they sit to the origin corner. A best-first
+    search of the container's R-tree; predicate skips items it rejects.
+    """
+    container = cargo_system.containers.get(container_id)
+    if container is None or k < 1:
+        return []
+
+    items = cargo_system.items
+    accept = (lambda item_id: predicate(items[item_id])) if predicate is not None else None
+    pairs = container_rtree(container).nearest((position.x, position.y, position.z), k, accept)
+    return [(items[item_id], distance) for item_id, distance in pairs]
+
+
+def _removal_order(targets: List[Item], tree: ArrayRTreeIndex, items: Dict[str, Item]) -> List[Item]:
+    """The targets and everything blocking them, each after all items in front of it
+
+    Depth-first from each target in turn, emitting an item once everything
+    in front of it is out. Blockers always sit nearer the face than what
+    they block, so there are no cycles.
+    """
+    order = []
+    done = set()
+    stack = [(target, False) for target in reversed(targets)]
+    while stack:
+        current, expanded = stack.pop()
+        if current.id in done:
+            continue
+        if expanded:
+            done.add(current.id)
+            order.append(current)
+            continue
+
+        stack.append((current, True))
+        for blocker in reversed(blocking_items(current, tree, items)):
+            if blocker.id not in done:
+                stack.append((blocker, False))
+
+    return order
+
+
+def retrieval_plan(item_id: str, cargo_system: CargoSystem) -> Optional[Dict]:
+    """Which items have to come out, in what order, to retrieve item_id, and how to put them back
+
+    Blockers are found recursively: an item blocking the target may itself
+    be blocked, and always comes out after its own blockers. Every blocker
+    is removed once, the target retrieved, and the blockers placed back in
+    reverse order. Returns None if the item is unknown or not in a
+    container.
+    """
+    item = cargo_system.items.get(item_id)
+    if item is None or not item.position or item.container_id not in cargo_system.containers:
+        return None
+
+    container = cargo_system.containers[item.container_id]
+    order = _removal_order([item], container_rtree(container), cargo_system.items)
+
+    removals = order[:-1]
+    steps = [{"action": "remove", "itemId": blocker.id} for blocker in removals]
+    steps.append({"action": "retrieve", "itemId": item.id})
+    steps.extend(
+        {"action": "placeBack", "itemId": blocker.id, "position": blocker.position.to_dict()}
+        for blocker in reversed(removals)
+    )
+    for number, step in enumerate(steps, start=1):
+        step["step"] = number
+
+    return {
+        "itemId": item.id,
+        "containerId": container.id,
+        "blockingItems": [blocker.id for blocker in removals],
+        "removeSteps": len(removals),
+        "totalSteps": len(steps),
+        "steps": steps
+    }
+
+
+def batch_retrieval(item_ids: List[str], cargo_system: CargoSystem, voxel: Optional[int] = None) -> Dict:
+    """Paths to many items plus one retrieval order for all of them, searching each container once
+
+    Requests are grouped by container, and each container's paths are read
+    off its entrance distance field (see entrance_path) on the voxel grid
+    optimize_retrieval would use, instead of a search per item. Within a
+    container items come out front to back: a requested item blocking
+    another is retrieved rather than moved aside, and every other blocker
+    is removed once and placed back after the container's last retrieval.
+    Unknown or unplaced ids are listed under notFound.
+    """
+    by_container: Dict[str, List[Item]] = {}
+    not_found = []
+    for item_id in dict.fromkeys(item_ids):
+        item = cargo_system.items.get(item_id)
+        if item is None or not item.position or item.container_id not in cargo_system.containers:
+            not_found.append(item_id)
+            continue
+        by_container.setdefault(item.container_id, []).append(item)
+
+    paths = {}
+    order = []
+    steps = []
+    removals = 0
+    for container_id, targets in by_container.items():
+        container = cargo_system.containers[container_id]
+        grid = container_grid(container)
+        size = voxel or max(1, math.ceil(max(grid.shape) / FINE_LEVEL_CELLS))
+        for item in targets:
+            paths[item.id] = [position.to_dict() for position in entrance_path(grid, item, size)]
+
+        requested = {item.id for item in targets}
+        targets.sort(key=lambda item: (item.position.z, item.id))
+        moved = []
+        for current in _removal_order(targets, container_rtree(container), cargo_system.items):
+            if current.id in requested:
+                order.append(current.id)
+                steps.append({"action": "retrieve", "itemId": current.id, "containerId": container_id})
+            else:
+                moved.append(current)
+                steps.append({"action": "remove", "itemId": current.id, "containerId": container_id})
+        steps.extend(
+            {"action": "placeBack", "itemId": blocker.id, "containerId": container_id,
+             "position": blocker.position.to_dict()}
+            for blocker in reversed(moved)
+        )
+        removals += len(moved)
+
+    for number, step in enumerate(steps, start=1):
+        step["step"] = number
+
+    return {
+        "order": order,
+        "paths": paths,
+        "removeSteps": removals,
+        "totalSteps": len(steps),
+        "steps": steps,
+        "notFound": not_found
+    }
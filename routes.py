@@ -1,9 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import io
+import json
+import shutil
+import tempfile
+from itertools import islice
+from typing import List
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from app.auth import create_access_token, fake_users_db
+from app.auth import create_access_token, fake_users_db, get_current_user
+from app.importer import MANIFEST_FORMATS, import_manifest
+from app.models import ITEM_FIELDS, CargoSystem, Position
+from app.retrieval import batch_retrieval, retrieval_plan
+from app.search import SearchCache, autocomplete, nearest_items, search_items, search_items_page
 
 router = APIRouter()
 
+# Station state shared by the API endpoints
+cargo_system = CargoSystem()
+
+# Results of repeated (dashboard) searches, dropped whenever cargo_system changes
+search_cache = SearchCache()
+
 
 @router.post("/api/login")
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
@@ -19,9 +37,135 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
 
 
 @router.get("/api/items")
-async def get_items():
-    # Replace with actual data fetching logic
-    return [
-        {"id": 1, "name": "Quantum Stabilizer", "zone": "A"},
-        {"id": 2, "name": "Plasma Injector", "zone": "B"}
-    ]
+async def get_items(limit: int = Query(100, ge=1, le=1000), cursor: str = Query(None),
+                    fields: str = Query(None), priority: int = Query(None), zone: str = Query(None),
+                    container_id: str = Query(None), format: str = Query("json"),
+                    user: dict = Depends(get_current_user)):
+    """Items in insertion order, one page at a time or, with format=ndjson, all streamed
+
+    fields is a comma-separated projection of Item.to_dict keys. Pass the
+    returned nextCursor back to get the next page; in ndjson mode the cursor
+    is also honoured and limit is ignored.
+    """
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unsupported format: {format}")
+
+    projection = None
+    if fields:
+        projection = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in projection if field not in ITEM_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"Unknown item fields: {', '.join(unknown)}")
+
+    after = None
+    if cursor:
+        try:
+            after = int(cursor)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    filters = {}
+    if priority is not None:
+        filters["priority"] = priority
+    if zone is not None:
+        filters["preferred_zone"] = zone
+    if container_id is not None:
+        filters["container_id"] = container_id
+
+    items = cargo_system.iter_items(after, **filters)
+
+    if format == "ndjson":
+        def item_lines():
+            # Serialize lazily, a batch of lines per chunk
+            for batch in iter(lambda: list(islice(items, 500)), []):
+                yield "".join(json.dumps(item.to_dict(projection)) + "\n" for _, item in batch)
+
+        return StreamingResponse(item_lines(), media_type="application/x-ndjson")
+
+    page = list(islice(items, limit + 1))
+    next_cursor = str(page[limit - 1][0]) if len(page) > limit else None
+    return {
+        "items": [item.to_dict(projection) for _, item in page[:limit]],
+        "nextCursor": next_cursor
+    }
+
+
+@router.get("/api/retrieve/batch")
+async def get_batch_retrieval(ids: List[str] = Query(...),
+                              user: dict = Depends(get_current_user)):
+    return batch_retrieval(ids, cargo_system)
+
+
+@router.get("/api/retrieve/{item_id}/plan")
+async def get_retrieval_plan(item_id: str, user: dict = Depends(get_current_user)):
+    plan = retrieval_plan(item_id, cargo_system)
+    if plan is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found in any container")
+    return plan
+
+
+@router.get("/api/search")
+async def search(q: str = "", priority: int = Query(None), x: float = Query(None), y: float = Query(None),
+                 z: float = Query(None), radius: float = Query(None, gt=0),
+                 limit: int = Query(None, ge=1, le=1000), cursor: str = Query(None),
+                 user: dict = Depends(get_current_user)):
+    """All matching items, or with limit / cursor one page and a nextCursor for the rest"""
+    location = Position(x, y, z) if None not in (x, y, z) else None
+    if limit is not None or cursor is not None:
+        try:
+            page = search_items_page(q, cargo_system, limit or 20, cursor, location, radius, priority)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        return page.to_dict()
+
+    items = search_items(q, cargo_system, location, radius, priority, cache=search_cache)
+    return {"items": [item.to_dict() for item in items]}
+
+
+@router.get("/api/search/nearest")
+async def search_nearest(x: float, y: float, z: float, k: int = Query(5, ge=1, le=100), q: str = "",
+                         priority: int = Query(None), user: dict = Depends(get_current_user)):
+    items = nearest_items(cargo_system, Position(x, y, z), k, q, priority)
+    return {"items": [item.to_dict() for item in items]}
+
+
+@router.get("/api/search/cache")
+async def search_cache_stats(user: dict = Depends(get_current_user)):
+    return search_cache.stats()
+
+
+@router.get("/api/search/autocomplete")
+async def autocomplete_items(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=50),
+                             user: dict = Depends(get_current_user)):
+    return {"query": q, "suggestions": autocomplete(q, cargo_system, limit)}
+
+
+@router.post("/api/import/{kind}")
+async def import_manifest_file(kind: str, file: UploadFile = File(...), format: str = Query(None),
+                               chunk_size: int = Query(1000, ge=1, le=50000), place: bool = False,
+                               user: dict = Depends(get_current_user)):
+    if kind not in ("items", "containers"):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown manifest kind")
+
+    fmt = format or ("jsonl" if (file.filename or "").endswith((".jsonl", ".ndjson")) else "csv")
+    if fmt not in MANIFEST_FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unsupported format: {fmt}")
+
+    # Copy the upload into a file the response owns: the framework may close the
+    # upload once the handler returns, before the stream below has been read
+    spool = tempfile.TemporaryFile()
+    try:
+        shutil.copyfileobj(file.file, spool)
+        spool.seek(0)
+    except Exception:
+        spool.close()
+        raise
+
+    def progress_lines():
+        # Read it as text line by line; progress goes out as one JSON line per chunk
+        with io.TextIOWrapper(spool, encoding="utf-8", newline="") as stream:
+            for progress in import_manifest(stream, cargo_system, kind, fmt, chunk_size, place, user["username"]):
+                yield json.dumps(progress) + "\n"
+
+    return StreamingResponse(progress_lines(), media_type="application/x-ndjson")
@@ -0,0 +1,646 @@
+import heapq
+import math
+from itertools import count, islice
+
+import numpy as np
+
+
+class RTreeNode:
+    def __init__(self, bounds, is_leaf=True):
+        self.bounds = bounds  # (min_x, min_y, min_z, max_x, max_y, max_z)
+        self.is_leaf = is_leaf
+        self.entries = []  # For leaf: (bounds, item_id); For non-leaf: (bounds, child_node)
+
+
+class RTreeIndex:
+    def __init__(self, max_entries=5):
+        self.root = RTreeNode((0, 0, 0, 0, 0, 0), True)
+        self.max_entries = max_entries
+        # Nodes left with fewer entries by a delete are dissolved and their items reinserted;
+        # well below the half-full nodes splits produce, so deletes rarely trigger reinsertion
+        self.min_entries = max(1, int(max_entries * 0.3))
+        # item_id -> bounds of every indexed item, so items can be deleted by id
+        self.entry_bounds = {}
+        # Version of the owner's contents this tree reflects, for owners that cache it (see Container)
+        self.version = 0
+
+    def __len__(self):
+        return len(self.entry_bounds)
+
+    def __contains__(self, item_id):
+        return item_id in self.entry_bounds
+
+    @classmethod
+    def bulk_load(cls, entries, max_entries=5):
+        """Build a packed tree from (item_id, bounds) pairs with Sort-Tile-Recursive
+
+        Entries are sorted into x slabs, each slab into y runs and each run
+        along z, then cut into full nodes; the same packing is repeated on
+        the nodes until a single root is left.
+        """
+        tree = cls(max_entries)
+        tree.entry_bounds = dict(entries)
+        if not tree.entry_bounds:
+            return tree
+
+        level = [(bounds, item_id) for item_id, bounds in tree.entry_bounds.items()]
+        is_leaf = True
+        while True:
+            nodes = []
+            for group in tree._tile(level):
+                node = RTreeNode(tree._merge_all_bounds([entry[0] for entry in group]), is_leaf)
+                node.entries = group
+                nodes.append(node)
+            if len(nodes) == 1:
+                tree.root = nodes[0]
+                return tree
+            level = [(node.bounds, node) for node in nodes]
+            is_leaf = False
+
+    def _tile(self, entries):
+        """Cut entries into node-sized groups of neighbours, sorting by x, then y, then z centre"""
+        size = self.max_entries
+        slices = math.ceil(math.ceil(len(entries) / size) ** (1 / 3))
+
+        def center(axis):
+            return lambda entry: entry[0][axis] + entry[0][axis + 3]
+
+        entries = sorted(entries, key=center(0))
+        for slab_start in range(0, len(entries), size * slices * slices):
+            slab = sorted(entries[slab_start:slab_start + size * slices * slices], key=center(1))
+            for run_start in range(0, len(slab), size * slices):
+                run = sorted(slab[run_start:run_start + size * slices], key=center(2))
+                for start in range(0, len(run), size):
+                    yield run[start:start + size]
+
+    def insert(self, item_id, bounds):
+        """Insert item with its 3D bounds, replacing its previous bounds if already indexed"""
+        if item_id in self.entry_bounds:
+            self.delete(item_id)
+        self.entry_bounds[item_id] = bounds
+        self._insert_entry(item_id, bounds)
+
+    def _insert_entry(self, item_id, bounds):
+        sibling = self._insert(self.root, item_id, bounds)
+
+        # Root split - grow the tree by one level
+        if sibling is not None:
+            new_root = RTreeNode(self._merge_all_bounds([self.root.bounds, sibling.bounds]), False)
+            new_root.entries = [(self.root.bounds, self.root), (sibling.bounds, sibling)]
+            self.root = new_root
+
+    def _insert(self, node, item_id, bounds):
+        """Insert into the subtree at node, returning the new sibling if node split"""
+        if node.is_leaf:
+            node.entries.append((bounds, item_id))
+        else:
+            # Choose best subtree
+            best_idx = self._choose_subtree(node, bounds)
+            child = node.entries[best_idx][1]
+
+            sibling = self._insert(child, item_id, bounds)
+
+            # Update parent entries, adopting the child's sibling if it split
+            node.entries[best_idx] = (child.bounds, child)
+            if sibling is not None:
+                node.entries.append((sibling.bounds, sibling))
+
+        # Everything below grew by at most bounds
+        node.bounds = bounds if len(node.entries) == 1 and node.is_leaf else self._expand_bounds(node.bounds, bounds)
+
+        if len(node.entries) > self.max_entries:
+            return self._split_node(node)
+        return None
+
+    def delete(self, item_id):
+        """Remove an item, returning whether it was indexed
+
+        Nodes left underfull on the way back to the root are dropped and
+        their items reinserted (condense), and a root left with a single
+        child is replaced by that child.
+        """
+        bounds = self.entry_bounds.pop(item_id, None)
+        if bounds is None:
+            return False
+
+        path = self._find_leaf(self.root, item_id, bounds)
+        leaf = path[-1]
+        leaf.entries = [entry for entry in leaf.entries if entry[1] != item_id]
+
+        orphans = []
+        for depth in range(len(path) - 1, 0, -1):
+            node, parent = path[depth], path[depth - 1]
+            index = next(i for i, (_, child) in enumerate(parent.entries) if child is node)
+            if len(node.entries) < self.min_entries:
+                parent.entries.pop(index)
+                self._collect_entries(node, orphans)
+            else:
+                node.bounds = self._merge_all_bounds([entry[0] for entry in node.entries])
+                parent.entries[index] = (node.bounds, node)
+        self.root.bounds = self._merge_all_bounds([entry[0] for entry in self.root.entries])
+
+        while not self.root.is_leaf and len(self.root.entries) <= 1:
+            self.root = self.root.entries[0][1] if self.root.entries else RTreeNode((0, 0, 0, 0, 0, 0), True)
+
+        for orphan_bounds, orphan_id in orphans:
+            self._insert_entry(orphan_id, orphan_bounds)
+        return True
+
+    def _find_leaf(self, node, item_id, bounds):
+        """Root-to-leaf node path to the leaf holding item_id, or None"""
+        if node.is_leaf:
+            return [node] if any(entry_id == item_id for _, entry_id in node.entries) else None
+
+        for child_bounds, child in node.entries:
+            if self._contains(child_bounds, bounds):
+                path = self._find_leaf(child, item_id, bounds)
+                if path is not None:
+                    return [node] + path
+        return None
+
+    def _collect_entries(self, node, result):
+        """Append every (bounds, item_id) leaf entry below node to result"""
+        if node.is_leaf:
+            result.extend(node.entries)
+        else:
+            for _, child in node.entries:
+                self._collect_entries(child, result)
+
+    def _choose_subtree(self, node, bounds):
+        min_enlargement = float('inf')
+        best_idx = 0
+
+        min_volume = float('inf')
+
+        for i, (child_bounds, _) in enumerate(node.entries):
+            volume = self._calculate_volume(child_bounds)
+            enlargement = self._calculate_volume(self._expand_bounds(child_bounds, bounds)) - volume
+
+            # Ties go to the smaller child
+            if enlargement < min_enlargement or (enlargement == min_enlargement and volume < min_volume):
+                min_enlargement = enlargement
+                min_volume = volume
+                best_idx = i
+
+        return best_idx
+
+    def _split_node(self, node):
+        # Linear split
+        entries = node.entries
+        node.entries = []
+
+        seed_idx1, seed_idx2 = self._pick_seeds(entries)
+
+        # Create two groups
+        group1 = [entries[seed_idx1]]
+        group2 = [entries[seed_idx2]]
+        bounds1 = entries[seed_idx1][0]
+        bounds2 = entries[seed_idx2][0]
+
+        remaining = [entry for i, entry in enumerate(entries)
+                     if i != seed_idx1 and i != seed_idx2]
+
+        # Distribute remaining entries, each group keeping at least half the node
+        min_fill = self.max_entries // 2
+        while remaining:
+            if len(group1) + len(remaining) <= min_fill:
+                group1.extend(remaining)
+                break
+
+            if len(group2) + len(remaining) <= min_fill:
+                group2.extend(remaining)
+                break
+
+            # Next is the entry with the strongest preference for one group, which takes it
+            selected_idx = 0
+            selected_group = 1
+            max_diff = -1
+            volume1 = self._calculate_volume(bounds1)
+            volume2 = self._calculate_volume(bounds2)
+
+            for i, entry in enumerate(remaining):
+                enlargement1 = self._calculate_volume(self._expand_bounds(bounds1, entry[0])) - volume1
+                enlargement2 = self._calculate_volume(self._expand_bounds(bounds2, entry[0])) - volume2
+
+                diff = abs(enlargement1 - enlargement2)
+
+                if diff > max_diff:
+                    max_diff = diff
+                    selected_idx = i
+                    if enlargement1 != enlargement2:
+                        selected_group = 1 if enlargement1 < enlargement2 else 2
+                    else:
+                        selected_group = 1 if len(group1) <= len(group2) else 2
+
+            if selected_group == 1:
+                group1.append(remaining[selected_idx])
+                bounds1 = self._expand_bounds(bounds1, remaining[selected_idx][0])
+            else:
+                group2.append(remaining[selected_idx])
+                bounds2 = self._expand_bounds(bounds2, remaining[selected_idx][0])
+
+            remaining.pop(selected_idx)
+
+        # Node keeps the first group, a new sibling takes the second
+        node.entries = group1
+        node.bounds = self._merge_all_bounds([e[0] for e in group1])
+
+        sibling = RTreeNode(self._merge_all_bounds([e[0] for e in group2]), node.is_leaf)
+        sibling.entries = group2
+
+        return sibling
+
+    def _pick_seeds(self, entries):
+        """Linear seed pick: the two entries furthest apart along any axis, relative to the node's extent"""
+        best_separation = float('-inf')
+        seeds = (0, 1)
+
+        for axis in range(3):
+            highest_low = max(range(len(entries)), key=lambda i: entries[i][0][axis])
+            lowest_high = min((i for i in range(len(entries)) if i != highest_low),
+                              key=lambda i: entries[i][0][axis + 3])
+            extent = (max(entry[0][axis + 3] for entry in entries) -
+                      min(entry[0][axis] for entry in entries))
+            separation = entries[highest_low][0][axis] - entries[lowest_high][0][axis + 3]
+            if extent > 0:
+                separation /= extent
+
+            if separation > best_separation:
+                best_separation = separation
+                seeds = (lowest_high, highest_low)
+
+        return seeds
+
+    def query(self, bounds):
+        """Query items within or intersecting bounds"""
+        result = []
+        self._query(self.root, bounds, result)
+        return result
+
+    def _query(self, node, bounds, result):
+        if not self._intersects(node.bounds, bounds):
+            return
+
+        if node.is_leaf:
+            for entry_bounds, item_id in node.entries:
+                if self._intersects(entry_bounds, bounds):
+                    result.append(item_id)
+        else:
+            for _, child in node.entries:
+                self._query(child, bounds, result)
+
+    def iter_nearest(self, point):
+        """Yield (item_id, distance) from point, closest first, computing only as far as consumed
+
+        Best-first: one heap holds nodes keyed by the smallest distance any
+        item inside them could have and items keyed by their own distance,
+        so a node is only opened once nothing already seen can be closer.
+        Distances are to the nearest point of each item's bounds (0 inside).
+        Equal distances come out by item_id.
+        """
+        # Nodes sort before items at the same distance, since they may hold an equally close item
+        tiebreak = count()
+        heap = [(self._min_distance(self.root.bounds, point), 0, next(tiebreak), self.root)]
+        while heap:
+            entry = heapq.heappop(heap)
+            if entry[1] == 1:
+                yield entry[2], entry[0]
+                continue
+
+            node = entry[3]
+            if node.is_leaf:
+                for bounds, item_id in node.entries:
+                    heapq.heappush(heap, (self._min_distance(bounds, point), 1, item_id))
+            else:
+                for bounds, child in node.entries:
+                    heapq.heappush(heap, (self._min_distance(bounds, point), 0, next(tiebreak), child))
+
+    def nearest(self, point, k=1, predicate=None):
+        """The k (item_id, distance) pairs closest to point, nearest first, see iter_nearest
+
+        predicate, if given, is called with each item_id in distance order
+        and skips those it rejects.
+        """
+        found = self.iter_nearest(point)
+        if predicate is not None:
+            found = ((item_id, distance) for item_id, distance in found if predicate(item_id))
+        return list(islice(found, k))
+
+    def _min_distance(self, bounds, point):
+        """Distance from point to the nearest point of bounds"""
+        min_x, min_y, min_z, max_x, max_y, max_z = bounds
+        x, y, z = point
+        return math.hypot(
+            min_x - x if x < min_x else (x - max_x if x > max_x else 0),
+            min_y - y if y < min_y else (y - max_y if y > max_y else 0),
+            min_z - z if z < min_z else (z - max_z if z > max_z else 0)
+        )
+
+    def _expand_bounds(self, bounds1, bounds2):
+        """Expand bounds1 to include bounds2"""
+        min_x1, min_y1, min_z1, max_x1, max_y1, max_z1 = bounds1
+        min_x2, min_y2, min_z2, max_x2, max_y2, max_z2 = bounds2
+
+        return (
+            min(min_x1, min_x2),
+            min(min_y1, min_y2),
+            min(min_z1, min_z2),
+            max(max_x1, max_x2),
+            max(max_y1, max_y2),
+            max(max_z1, max_z2)
+        )
+
+    def _merge_all_bounds(self, bounds_list):
+        """Merge multiple bounds"""
+        if not bounds_list:
+            return (0, 0, 0, 0, 0, 0)
+
+        result = bounds_list[0]
+        for bounds in bounds_list[1:]:
+            result = self._expand_bounds(result, bounds)
+
+        return result
+
+    def _calculate_volume(self, bounds):
+        """Calculate volume of bounds"""
+        min_x, min_y, min_z, max_x, max_y, max_z = bounds
+        return max(0, max_x - min_x) * max(0, max_y - min_y) * max(0, max_z - min_z)
+
+    def _calculate_margin(self, bounds):
+        """Calculate margin (sum of edge lengths) of bounds"""
+        min_x, min_y, min_z, max_x, max_y, max_z = bounds
+        return (max_x - min_x) + (max_y - min_y) + (max_z - min_z)
+
+    def _contains(self, outer, inner):
+        """Check if outer fully encloses inner"""
+        return all(outer[axis] <= inner[axis] and inner[axis + 3] <= outer[axis + 3] for axis in range(3))
+
+    def _intersects(self, bounds1, bounds2):
+        """Check if two bounds intersect"""
+        min_x1, min_y1, min_z1, max_x1, max_y1, max_z1 = bounds1
+        min_x2, min_y2, min_z2, max_x2, max_y2, max_z2 = bounds2
+
+        return (
+                min_x1 <= max_x2 and max_x1 >= min_x2 and
+                min_y1 <= max_y2 and max_y1 >= min_y2 and
+                min_z1 <= max_z2 and max_z1 >= min_z2
+        )
+
+
+class ArrayRTreeNode:
+    def __init__(self, is_leaf=True):
+        self.is_leaf = is_leaf
+        # Row per entry: (min_x, min_y, min_z, max_x, max_y, max_z) of the item or child node
+        self.boxes = np.empty((0, 6))
+        self.children = []  # For leaf: item_id per row; For non-leaf: child node per row
+
+    @property
+    def bounds(self):
+        return np.concatenate([self.boxes[:, :3].min(axis=0), self.boxes[:, 3:].max(axis=0)])
+
+
+class ArrayRTreeIndex:
+    """R-tree with each node's entry bounds in one (k, 6) array
+
+    Same interface as RTreeIndex, but choosing a subtree, splitting and
+    intersection tests run over all of a node's entries in single numpy
+    operations, so nodes can be much wider. query_many answers a whole
+    batch of boxes in one traversal.
+    """
+
+    def __init__(self, max_entries=32):
+        self.root = ArrayRTreeNode(True)
+        self.max_entries = max_entries
+        self.min_entries = max(1, int(max_entries * 0.3))
+        # item_id -> bounds of every indexed item, so items can be deleted by id
+        self.entry_bounds = {}
+        # Version of the owner's contents this tree reflects, for owners that cache it
+        self.version = 0
+
+    def __len__(self):
+        return len(self.entry_bounds)
+
+    def __contains__(self, item_id):
+        return item_id in self.entry_bounds
+
+    @classmethod
+    def bulk_load(cls, entries, max_entries=32):
+        """Build a packed tree from (item_id, bounds) pairs with Sort-Tile-Recursive, see RTreeIndex.bulk_load"""
+        tree = cls(max_entries)
+        tree.entry_bounds = dict(entries)
+        if not tree.entry_bounds:
+            return tree
+
+        children = list(tree.entry_bounds)
+        boxes = np.array([tree.entry_bounds[item_id] for item_id in children], dtype=float)
+        is_leaf = True
+        while True:
+            nodes = []
+            for group in tree._tile(boxes):
+                node = ArrayRTreeNode(is_leaf)
+                node.boxes = boxes[group]
+                node.children = [children[i] for i in group]
+                nodes.append(node)
+            if len(nodes) == 1:
+                tree.root = nodes[0]
+                return tree
+            children = nodes
+            boxes = np.array([node.bounds for node in nodes])
+            is_leaf = False
+
+    def _tile(self, boxes):
+        """Index groups of node size cutting boxes into x slabs, y runs and z-ordered nodes"""
+        size = self.max_entries
+        slices = math.ceil(math.ceil(len(boxes) / size) ** (1 / 3))
+        centers = boxes[:, :3] + boxes[:, 3:]
+
+        order = np.argsort(centers[:, 0], kind="stable")
+        for slab_start in range(0, len(order), size * slices * slices):
+            slab = order[slab_start:slab_start + size * slices * slices]
+            slab = slab[np.argsort(centers[slab, 1], kind="stable")]
+            for run_start in range(0, len(slab), size * slices):
+                run = slab[run_start:run_start + size * slices]
+                run = run[np.argsort(centers[run, 2], kind="stable")]
+                for start in range(0, len(run), size):
+                    yield run[start:start + size]
+
+    def insert(self, item_id, bounds):
+        """Insert item with its 3D bounds, replacing its previous bounds if already indexed"""
+        if item_id in self.entry_bounds:
+            self.delete(item_id)
+        self.entry_bounds[item_id] = bounds
+        self._insert_entry(item_id, np.asarray(bounds, dtype=float))
+
+    def _insert_entry(self, item_id, box):
+        sibling = self._insert(self.root, item_id, box)
+
+        # Root split - grow the tree by one level
+        if sibling is not None:
+            new_root = ArrayRTreeNode(False)
+            new_root.boxes = np.array([self.root.bounds, sibling.bounds])
+            new_root.children = [self.root, sibling]
+            self.root = new_root
+
+    def _insert(self, node, item_id, box):
+        """Insert into the subtree at node, returning the new sibling if node split"""
+        if node.is_leaf:
+            node.boxes = np.vstack([node.boxes, box])
+            node.children.append(item_id)
+        else:
+            # Least volume enlargement, ties to the smaller child
+            volumes = _volumes(node.boxes)
+            enlargements = _volumes(_union(node.boxes, box)) - volumes
+            best_idx = np.lexsort((volumes, enlargements))[0]
+            child = node.children[best_idx]
+
+            sibling = self._insert(child, item_id, box)
+
+            node.boxes[best_idx] = child.bounds
+            if sibling is not None:
+                node.boxes = np.vstack([node.boxes, sibling.bounds])
+                node.children.append(sibling)
+
+        if len(node.children) > self.max_entries:
+            return self._split_node(node)
+        return None
+
+    def _split_node(self, node):
+        """Halve the node along the axis its entry centres spread furthest on"""
+        centers = node.boxes[:, :3] + node.boxes[:, 3:]
+        axis = np.argmax(centers.max(axis=0) - centers.min(axis=0))
+        order = np.argsort(centers[:, axis], kind="stable")
+        keep, move = order[:len(order) // 2], order[len(order) // 2:]
+
+        sibling = ArrayRTreeNode(node.is_leaf)
+        sibling.boxes = node.boxes[move]
+        sibling.children = [node.children[i] for i in move]
+        node.boxes = node.boxes[keep]
+        node.children = [node.children[i] for i in keep]
+        return sibling
+
+    def delete(self, item_id):
+        """Remove an item, returning whether it was indexed; condenses like RTreeIndex.delete"""
+        bounds = self.entry_bounds.pop(item_id, None)
+        if bounds is None:
+            return False
+
+        path = self._find_leaf(self.root, item_id, np.asarray(bounds, dtype=float))
+        leaf = path[-1]
+        row = leaf.children.index(item_id)
+        leaf.boxes = np.delete(leaf.boxes, row, axis=0)
+        del leaf.children[row]
+
+        orphans = []
+        for depth in range(len(path) - 1, 0, -1):
+            node, parent = path[depth], path[depth - 1]
+            index = next(i for i, child in enumerate(parent.children) if child is node)
+            if len(node.children) < self.min_entries:
+                parent.boxes = np.delete(parent.boxes, index, axis=0)
+                del parent.children[index]
+                self._collect_entries(node, orphans)
+            else:
+                parent.boxes[index] = node.bounds
+
+        while not self.root.is_leaf and len(self.root.children) <= 1:
+            self.root = self.root.children[0] if self.root.children else ArrayRTreeNode(True)
+
+        for orphan_box, orphan_id in orphans:
+            self._insert_entry(orphan_id, orphan_box)
+        return True
+
+    def _find_leaf(self, node, item_id, box):
+        """Root-to-leaf node path to the leaf holding item_id, or None"""
+        if node.is_leaf:
+            return [node] if item_id in node.children else None
+
+        contains = np.all(node.boxes[:, :3] <= box[:3], axis=1) & np.all(node.boxes[:, 3:] >= box[3:], axis=1)
+        for index in np.flatnonzero(contains):
+            path = self._find_leaf(node.children[index], item_id, box)
+            if path is not None:
+                return [node] + path
+        return None
+
+    def _collect_entries(self, node, result):
+        """Append every (box, item_id) leaf entry below node to result"""
+        if node.is_leaf:
+            result.extend(zip(node.boxes, node.children))
+        else:
+            for child in node.children:
+                self._collect_entries(child, result)
+
+    def query(self, bounds):
+        """Query items within or intersecting bounds"""
+        return self.query_many([bounds])[0]
+
+    def query_many(self, boxes):
+        """Items intersecting each of boxes, as one list per box in order
+
+        Walks the tree once for the whole batch: at every node all pending
+        boxes are tested against all entries in one step, and each child
+        is visited with just the boxes that reached it.
+        """
+        queries = np.asarray(boxes, dtype=float).reshape(-1, 6)
+        results = [[] for _ in range(len(queries))]
+        if not self.entry_bounds or not len(queries):
+            return results
+
+        stack = [(self.root, np.arange(len(queries)))]
+        while stack:
+            node, pending = stack.pop()
+            batch = queries[pending]
+            hits = (
+                np.all(node.boxes[None, :, :3] <= batch[:, None, 3:], axis=2) &
+                np.all(node.boxes[None, :, 3:] >= batch[:, None, :3], axis=2)
+            )
+            if node.is_leaf:
+                for query_row, entry in zip(*np.nonzero(hits)):
+                    results[pending[query_row]].append(node.children[entry])
+            else:
+                for entry in np.flatnonzero(hits.any(axis=0)):
+                    stack.append((node.children[entry], pending[hits[:, entry]]))
+        return results
+
+    def iter_nearest(self, point):
+        """Yield (item_id, distance) from point, closest first, see RTreeIndex.iter_nearest
+
+        The distances to all of a node's entries are computed in one step.
+        """
+        point = np.asarray(point, dtype=float)
+        # Nodes sort before items at the same distance, since they may hold an equally close item
+        tiebreak = count()
+        heap = [(_min_distances(self.root.boxes, point).min(initial=math.inf), 0, next(tiebreak), self.root)]
+        while heap:
+            entry = heapq.heappop(heap)
+            if entry[1] == 1:
+                yield entry[2], entry[0]
+                continue
+
+            node = entry[3]
+            distances = _min_distances(node.boxes, point).tolist()
+            if node.is_leaf:
+                for distance, item_id in zip(distances, node.children):
+                    heapq.heappush(heap, (distance, 1, item_id))
+            else:
+                for distance, child in zip(distances, node.children):
+                    heapq.heappush(heap, (distance, 0, next(tiebreak), child))
+
+    def nearest(self, point, k=1, predicate=None):
+        """The k (item_id, distance) pairs closest to point, nearest first, see RTreeIndex.nearest"""
+        found = self.iter_nearest(point)
+        if predicate is not None:
+            found = ((item_id, distance) for item_id, distance in found if predicate(item_id))
+        return list(islice(found, k))
+
+
+def _min_distances(boxes, point):
+    """Distance from point to the nearest point of each box"""
+    gaps = np.maximum(np.maximum(boxes[:, :3] - point, point - boxes[:, 3:]), 0)
+    return np.sqrt((gaps * gaps).sum(axis=1))
+
+
+def _volumes(boxes):
+    return np.prod(np.maximum(boxes[..., 3:] - boxes[..., :3], 0), axis=-1)
+
+
+def _union(boxes, box):
+    return np.concatenate([np.minimum(boxes[:, :3], box[:3]), np.maximum(boxes[:, 3:], box[3:])], axis=1)
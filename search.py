@@ -1,6 +1,14 @@
+import heapq
 import math
-from typing import List, Dict, Set, Optional
-from app.models import CargoSystem, Item, Position
+import uuid
+from collections import OrderedDict
+from typing import List, Dict, Set, Tuple, Optional, Any
+from app.indexes import max_edits
+from app.models import CargoSystem, Item, Container, Position
+
+# Live search cursors, oldest evicted first
+MAX_OPEN_CURSORS = 256
+_cursors: "OrderedDict[str, Any]" = OrderedDict()  # RankedSearch or OrderedSearch
 
 
 def calculate_idf(term: str, documents: Dict[str, List[str]], total_docs: int) -> float:
@@ -42,8 +50,13 @@ def calculate_bm25_score(query_terms: List[str], documents: Dict[str, List[str]]
     return scores
 
 
-def spatial_filter(items: List[Item], location: Position, radius: float) -> List[Item]:
-    """Filter items by spatial proximity"""
+def spatial_filter(items: List[Item], location: Position, radius: float,
+                   containers: Optional[Dict[str, Container]] = None) -> List[Item]:
+    """Filter items by spatial proximity
+
+    Pass containers to measure from absolute station coordinates (container
+    position + item position) instead of container-relative ones.
+    """
     if not location or radius <= 0:
         return items
 
@@ -53,8 +66,17 @@ def spatial_filter(items: List[Item], location: Position, radius: float) -> List
         if not item.position:
             continue
 
+        position = item.position
+        if containers is not None:
+            container = containers.get(item.container_id)
+            if container is None:
+                continue
+            position = Position(container.position.x + position.x,
+                                container.position.y + position.y,
+                                container.position.z + position.z)
+
         # Calculate Euclidean distance
-        distance = location.distance_to(item.position)
+        distance = location.distance_to(position)
 
         if distance <= radius:
             filtered_items.append(item)
@@ -62,54 +84,454 @@ def spatial_filter(items: List[Item], location: Position, radius: float) -> List
     return filtered_items
 
 
+def items_within(cargo_system: CargoSystem, location: Position, radius: float) -> Dict[str, float]:
+    """item_id -> absolute distance for placed items within radius of a station location"""
+    return cargo_system.spatial_index.within((location.x, location.y, location.z), radius)
+
+
+def nearest_items(cargo_system: CargoSystem, location: Position, k: int = 5, query: str = "",
+                  priority: Optional[int] = None) -> List[Item]:
+    """The k placed items closest to a station location, nearest first
+
+    query (every term must appear in the item's name, id or zone) and
+    priority narrow it to the nearest items of one kind; candidates are
+    checked in distance order, so matches close by are found without
+    looking at the rest of the station.
+    """
+    query_terms = query.lower().split()
+    doc_terms = cargo_system.search_index.doc_terms
+
+    def matches(item_id: str) -> bool:
+        if item_id not in cargo_system.items:
+            return False
+        if priority is not None and cargo_system.items[item_id].priority != priority:
+            return False
+        return all(term in doc_terms.get(item_id, ()) for term in query_terms)
+
+    pairs = cargo_system.spatial_index.nearest((location.x, location.y, location.z), k, matches)
+    return [cargo_system.items[item_id] for item_id, _ in pairs]
+
+
+class SearchCache:
+    """LRU cache of search_items results for one cargo system
+
+    Entries are only valid for the cargo system epoch they were computed at;
+    the first lookup after any mutation drops them all.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Tuple, List[Item]]" = OrderedDict()
+        self.epoch = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(query: str, location: Optional[Position], radius: Optional[float], priority: Optional[int]) -> Tuple:
+        # Queries that tokenize the same share an entry
+        terms = " ".join(query.lower().split()) if query else ""
+        point = (location.x, location.y, location.z) if location else None
+        return terms, point, radius, priority
+
+    def get(self, key: Tuple, epoch: int) -> Optional[List[Item]]:
+        if epoch != self.epoch:
+            if self.entries:
+                self.invalidations += 1
+            self.entries.clear()
+            self.epoch = epoch
+
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return list(result)
+
+    def put(self, key: Tuple, epoch: int, result: List[Item]) -> None:
+        if epoch != self.epoch:
+            return
+        self.entries[key] = list(result)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "entries": len(self.entries),
+            "max_entries": self.max_entries
+        }
+
+
 def search_items(query: str, cargo_system: CargoSystem, location: Optional[Position] = None,
-                 radius: Optional[float] = None, priority: Optional[int] = None) -> List[Item]:
-    """BM25 + Spatial Filtering for item search"""
+                 radius: Optional[float] = None, priority: Optional[int] = None,
+                 cache: Optional[SearchCache] = None) -> List[Item]:
+    """BM25 + Spatial Filtering for item search, scored from cargo_system.search_index
+
+    With a cache, repeat searches are answered from it until the cargo
+    system's epoch moves.
+    """
+    if cache is not None:
+        key = SearchCache.key(query, location, radius, priority)
+        result = cache.get(key, cargo_system.epoch)
+        if result is None:
+            result = search_items(query, cargo_system, location, radius, priority)
+            cache.put(key, cargo_system.epoch, result)
+        return result
+
     if not query and not location and priority is None:
         return list(cargo_system.items.values())
 
     # Extract query terms
     query_terms = query.lower().split() if query else []
 
-    # Filter by priority first if specified
-    items_to_search = cargo_system.items.values()
+    # Resolve the radius and priority predicates against their indexes up front
+    nearby = None
+    if location and radius:
+        nearby = items_within(cargo_system, location, radius)
+    with_priority = None
     if priority is not None:
-        items_to_search = [item for item in items_to_search if item.priority == priority]
+        with_priority = cargo_system.attribute_index.lookup("priority", priority)
 
     # If only spatial search, skip BM25
-    if not query_terms and location and radius:
-        return spatial_filter(list(items_to_search), location, radius)
-
-    # Create documents from items
-    documents = {}
-    for item in items_to_search:
-        # Extract searchable terms from item
-        terms = []
-        terms.extend(item.name.lower().split())
-        terms.extend(item.id.lower().split())
-        terms.extend(item.preferred_zone.lower().split())
-
-        documents[item.id] = terms
+    if not query_terms and nearby is not None:
+        index = cargo_system.search_index
+        nearby_ids = [
+            item_id for item_id in nearby
+            if item_id in cargo_system.items and (with_priority is None or item_id in with_priority)
+        ]
+        nearby_ids.sort(key=lambda item_id: index.doc_order.get(item_id, 0))
+        return [cargo_system.items[item_id] for item_id in nearby_ids]
 
     # If no valid query terms, return all items
     if not query_terms:
-        return list(items_to_search)
+        if priority is not None:
+            return cargo_system.find_items(priority=priority)
+        return list(cargo_system.items.values())
 
-    # Calculate BM25 scores
-    scores = calculate_bm25_score(query_terms, documents)
+    # Calculate BM25 scores from the inverted index; corpus statistics are station-wide.
+    # Priority and radius filters run before scoring so rejected items cost no BM25 work
+    index = cargo_system.search_index
+
+    def in_filters(item_id):
+        if nearby is not None and item_id not in nearby:
+            return False
+        if with_priority is not None:
+            return item_id in with_priority
+        return item_id in cargo_system.items
+
+    accept = in_filters if priority is not None or nearby is not None else None
+
+    scores = index.bm25_scores(query_terms, accept=accept)
 
     # Filter out items with zero score
-    result_items = [
-        cargo_system.items[item_id]
+    ranked_ids = [
+        item_id
         for item_id, score in scores.items()
         if score > 0 and item_id in cargo_system.items
     ]
 
-    # Sort by score (descending)
-    result_items.sort(key=lambda item: scores[item.id], reverse=True)
+    # Sort by score (descending), ties in insertion order
+    ranked_ids.sort(key=lambda item_id: (-scores[item_id], index.doc_order[item_id]))
+    return [cargo_system.items[item_id] for item_id in ranked_ids]
+
+
+class RankedSearch:
+    """Resumable top-k BM25 evaluation with max-score pruning
+
+    Query terms are visited in order of decreasing score upper bound. A
+    document is only scored the first time it is met; once the bound of all
+    remaining terms falls below the k-th best score, the rest of the postings
+    are skipped. Scored documents that did not make a page, and the position
+    in the postings, are kept so the next page resumes without rescoring.
+    """
+
+    def __init__(self, index, query_terms: List[str], accept=None):
+        self.index = index
+        self.version = index.version
+        self.query_terms = query_terms
+        self.accept = accept
+
+        terms = {term for term in query_terms if term in index.postings}
+        bounds = {term: index.term_upper_bound(term) * query_terms.count(term) for term in terms}
+        self.terms = sorted(terms, key=lambda term: bounds[term], reverse=True)
+
+        # remaining_bound[i] bounds the score of any document first met at term i
+        self.remaining_bound = [0.0] * (len(self.terms) + 1)
+        for i in range(len(self.terms) - 1, -1, -1):
+            self.remaining_bound[i] = self.remaining_bound[i + 1] + bounds[self.terms[i]]
+
+        self.term_pos = 0
+        self.postings_iter = None
+        self.seen: Set[str] = set()
+        self.pending = []  # (score, -order, doc_id) scored but not yet returned
+        self.scored = 0
+        self.filtered = 0
+
+    def next_page(self, limit: int) -> List[str]:
+        """Doc ids of the next `limit` results, best first
+
+        Postings are iterated in place, so this raises ValueError instead of
+        resuming once the index has changed since the search started.
+        """
+        index = self.index
+        if self.version != index.version:
+            raise ValueError("Index changed since the search started")
+
+        # Min-heap of the current page's candidates; its root is the score to beat
+        self.pending.sort(reverse=True)
+        top = self.pending[:limit]
+        overflow = self.pending[limit:]
+        heapq.heapify(top)
+
+        while self.term_pos < len(self.terms):
+            if len(top) == limit and self.remaining_bound[self.term_pos] < top[0][0]:
+                break
+
+            if self.postings_iter is None:
+                self.postings_iter = iter(index.postings[self.terms[self.term_pos]])
+
+            doc_id = next(self.postings_iter, None)
+            if doc_id is None:
+                self.term_pos += 1
+                self.postings_iter = None
+                continue
 
-    # Apply spatial filtering if location is provided
-    if location and radius:
-        result_items = spatial_filter(result_items, location, radius)
+            if doc_id in self.seen:
+                continue
+            self.seen.add(doc_id)
+
+            if self.accept is not None and not self.accept(doc_id):
+                self.filtered += 1
+                continue
 
-    return result_items
+            self.scored += 1
+            entry = (index.bm25_score(doc_id, self.query_terms), -index.doc_order[doc_id], doc_id)
+            if len(top) < limit:
+                heapq.heappush(top, entry)
+            elif entry > top[0]:
+                overflow.append(heapq.heapreplace(top, entry))
+            else:
+                overflow.append(entry)
+
+        self.pending = overflow
+        return [doc_id for _, _, doc_id in sorted(top, reverse=True)]
+
+    def exhausted(self) -> bool:
+        return not self.pending and self.term_pos >= len(self.terms)
+
+    def skipped(self) -> int:
+        """Candidate documents never scored so far"""
+        unseen = set()
+        for term in self.terms[self.term_pos:]:
+            unseen.update(self.index.postings.get(term, ()))
+        return len(unseen - self.seen)
+
+
+class OrderedSearch:
+    """Resumable listing of accepted items in insertion order, for queries without terms
+
+    Walks the attribute index's insertion order (see AttributeIndex.iter_ordered)
+    and looks one accepted item ahead, so it knows whether another page exists.
+    Nothing is scored; it has the same paging interface as RankedSearch.
+    """
+
+    def __init__(self, index, attribute_index, accept=None):
+        self.index = index
+        self.version = index.version
+        self.accept = accept
+        self.ids = (item_id for _, item_id in attribute_index.iter_ordered())
+        self.pending = []  # accepted doc_id looked ahead but not yet returned
+        self.scored = 0
+        self.filtered = 0
+
+    def next_page(self, limit: int) -> List[str]:
+        """Doc ids of the next `limit` results, in insertion order"""
+        page = self.pending
+        while len(page) <= limit:
+            doc_id = next(self.ids, None)
+            if doc_id is None:
+                break
+            if self.accept is not None and not self.accept(doc_id):
+                self.filtered += 1
+                continue
+            page.append(doc_id)
+
+        self.pending = page[limit:]
+        return page[:limit]
+
+    def exhausted(self) -> bool:
+        return not self.pending
+
+    def skipped(self) -> int:
+        return 0
+
+
+class SearchPage:
+    def __init__(self, items: List[Item], next_cursor: Optional[str], scored: int, skipped: int):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.scored = scored
+        self.skipped = skipped
+
+    def to_dict(self) -> Dict:
+        return {
+            "items": [item.to_dict() for item in self.items],
+            "nextCursor": self.next_cursor,
+            "scored": self.scored,
+            "skipped": self.skipped
+        }
+
+
+def search_items_page(query: str, cargo_system: CargoSystem, limit: int = 20, cursor: Optional[str] = None,
+                      location: Optional[Position] = None, radius: Optional[float] = None,
+                      priority: Optional[int] = None) -> SearchPage:
+    """Top-k BM25 search returning one page at a time
+
+    Pass the returned next_cursor back (the other arguments are then ignored)
+    to get the following page. Filters are applied before scoring, so
+    filtered-out items cost no BM25 work. Like search_items, a query without
+    terms lists every item passing the filters, here in insertion order.
+    Raises ValueError for unknown or stale cursors, i.e. when the inventory
+    changed since the first page.
+    """
+    if limit < 1:
+        raise ValueError("limit must be positive")
+
+    if cursor is not None:
+        search = _cursors.pop(cursor, None)
+        if search is None or search.version != search.index.version:
+            raise ValueError("Unknown or expired search cursor")
+    else:
+        items = cargo_system.items
+        nearby = items_within(cargo_system, location, radius) if location and radius else None
+        with_priority = None
+        if priority is not None:
+            with_priority = cargo_system.attribute_index.lookup("priority", priority)
+
+        def accept(item_id):
+            if item_id not in items:
+                return False
+            if with_priority is not None and item_id not in with_priority:
+                return False
+            return nearby is None or item_id in nearby
+
+        query_terms = query.lower().split() if query else []
+        if query_terms:
+            search = RankedSearch(cargo_system.search_index, query_terms, accept)
+        else:
+            search = OrderedSearch(cargo_system.search_index, cargo_system.attribute_index, accept)
+
+    doc_ids = search.next_page(limit)
+
+    next_cursor = None
+    if not search.exhausted():
+        next_cursor = uuid.uuid4().hex
+        _cursors[next_cursor] = search
+        while len(_cursors) > MAX_OPEN_CURSORS:
+            _cursors.popitem(last=False)
+
+    return SearchPage(
+        [cargo_system.items[doc_id] for doc_id in doc_ids],
+        next_cursor,
+        search.scored,
+        search.skipped()
+    )
+
+
+def _match_score(token: str, term: str, edits: int) -> float:
+    """1.0 for an exact term, less for partial and misspelled matches"""
+    completeness = min(1.0, len(token) / len(term))
+    return (1 - 0.5 * edits / len(token)) * (0.5 + 0.5 * completeness)
+
+
+def _top_suggestions(tokens: List[str], cargo_system: CargoSystem, limit: int, fuzzy: bool) -> List:
+    """(score, item_id) of the best `limit` items matching every token, best first"""
+    index = cargo_system.search_index
+    completions = cargo_system.autocomplete_index
+
+    # Best score per matching term, for every query token
+    token_matches = []
+    for token in tokens:
+        edits = max_edits(token) if fuzzy else 0
+        found = completions.fuzzy_matches(token, edits) if edits else completions.prefix_matches(token)
+        if not found:
+            return []
+        token_matches.append({term: _match_score(token, term, distance) for term, distance in found.items()})
+
+    # Drive candidates from the token whose best terms are rarest, best terms first
+    sizes = []
+    for matches in token_matches:
+        best = max(matches.values())
+        sizes.append(sum(len(index.postings[term]) for term, score in matches.items() if score == best))
+    anchor = sizes.index(min(sizes))
+    anchor_terms = sorted(token_matches[anchor].items(), key=lambda pair: (-pair[1], pair[0]))
+    others = token_matches[:anchor] + token_matches[anchor + 1:]
+    # Most the other tokens can add to any item's score
+    others_bound = sum(max(matches.values()) for matches in others)
+
+    top = []  # min-heap of (score, -rank, item_id); earlier finds win ties
+    seen = set()
+    for term, term_score in anchor_terms:
+        if len(top) == limit and term_score + others_bound <= top[0][0]:
+            break
+        for item_id in index.postings[term]:
+            if len(top) == limit and term_score + others_bound <= top[0][0]:
+                break
+            if item_id in seen or item_id not in cargo_system.items:
+                continue
+            # Terms are visited best first, so this is the item's best anchor match
+            seen.add(item_id)
+
+            doc_terms = index.doc_terms[item_id]
+            score = term_score
+            for matches in others:
+                best = max((matches[t] for t in doc_terms if t in matches), default=0.0)
+                if not best:
+                    break
+                score += best
+            else:
+                entry = (score, -len(seen), item_id)
+                if len(top) < limit:
+                    heapq.heappush(top, entry)
+                elif entry > top[0]:
+                    heapq.heapreplace(top, entry)
+
+    return [(score, item_id) for score, _, item_id in sorted(top, reverse=True)]
+
+
+def autocomplete(query: str, cargo_system: CargoSystem, limit: int = 10) -> List[Dict]:
+    """Ranked item suggestions for a partial, possibly misspelled query
+
+    Every query token must match some term of an item (name, id or zone) as a
+    prefix, or, when exact prefixes give fewer than `limit` items, within
+    max_edits typos of a prefix. Items are ranked by the sum of their best
+    match per token. This is a lookup over the term dictionary only; no BM25
+    scoring happens here.
+    """
+    tokens = query.lower().split() if query else []
+    if not tokens or limit < 1:
+        return []
+
+    # Exact prefixes first; tolerate typos only when those cannot fill the list
+    suggestions = _top_suggestions(tokens, cargo_system, limit, fuzzy=False)
+    if len(suggestions) < limit and any(max_edits(token) for token in tokens):
+        suggestions = _top_suggestions(tokens, cargo_system, limit, fuzzy=True)
+
+    result = []
+    for score, item_id in suggestions:
+        item = cargo_system.items[item_id]
+        result.append({
+            "itemId": item.id,
+            "name": item.name,
+            "preferredZone": item.preferred_zone,
+            "score": round(score, 4)
+        })
+    return result
@@ -0,0 +1,66 @@
+import random
+import unittest
+
+from app.benchmark import generate_station
+from app.placement import (
+    FitnessArrays, FitnessState, batch_fitness_function, crossover, derive_fitness_state, fitness_function, mutate,
+    seed_population
+)
+
+
+class BatchFitnessTest(unittest.TestCase):
+    def setUp(self):
+        random.seed(7)
+        self.containers, self.items = generate_station(40, seed=3)
+        self.arrays = FitnessArrays(self.containers, self.items)
+        # Packed (valid) and random (mostly invalid) solutions
+        self.population = seed_population(self.containers, self.items, 12)
+
+    def test_matches_fitness_function(self):
+        scores = batch_fitness_function(self.population, self.arrays)
+        for solution, score in zip(self.population, scores):
+            self.assertAlmostEqual(score, fitness_function(solution, self.containers, self.items, {}), places=6)
+
+    def test_packed_solutions_score_above_invalid_ones(self):
+        scores = batch_fitness_function(self.population, self.arrays)
+        self.assertGreater(max(scores), -1000)
+
+
+class FitnessStateTest(unittest.TestCase):
+    def setUp(self):
+        random.seed(11)
+        self.containers, self.items = generate_station(40, seed=5)
+        self.arrays = FitnessArrays(self.containers, self.items)
+        self.population = seed_population(self.containers, self.items, 8)
+
+    def assertScoresLike(self, state, solution):
+        self.assertAlmostEqual(state.score(), fitness_function(solution, self.containers, self.items, {}), places=6)
+
+    def test_fresh_state_matches_fitness_function(self):
+        for solution in self.population:
+            self.assertScoresLike(FitnessState(solution, self.arrays), solution)
+
+    def test_derived_children_match_fitness_function(self):
+        parents = [FitnessState(solution, self.arrays) for solution in self.population[:4]]
+        for _ in range(30):
+            first, second = random.sample(self.population[:4], 2)
+            child = mutate(crossover(first, second), self.containers, mutation_rate=0.05)
+            self.assertScoresLike(derive_fitness_state(child, parents), child)
+
+    def test_update_leaves_the_parent_untouched(self):
+        solution = self.population[0]
+        parent = FitnessState(solution, self.arrays)
+        before = parent.score()
+
+        child = parent.copy()
+        changed = [0, 1]
+        genes = [(0, 0, 0, 0), (0, 0, 0, 0)]
+        child.update(changed, genes)
+        moved = list(solution)
+        moved[0], moved[1] = genes
+        self.assertScoresLike(child, moved)
+        self.assertEqual(parent.score(), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
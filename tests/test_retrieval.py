@@ -0,0 +1,46 @@
+import unittest
+from datetime import datetime
+
+from app.models import CargoSystem, Container, Dimensions, Item, Position
+from app.placement import place_new_items
+from app.retrieval import batch_retrieval, optimize_retrieval, retrieval_plan
+
+
+def make_item(item_id, width=10, depth=10, height=10):
+    return Item(item_id, item_id, Dimensions(width, depth, height), 1, datetime(2030, 1, 1), 5, "A", 1.0)
+
+
+class EntrancePathTest(unittest.TestCase):
+    def test_item_at_origin_does_not_seal_the_entrance(self):
+        cargo_system = CargoSystem()
+        cargo_system.add_container(Container("C1", "A", Dimensions(50, 50, 50), Position(0, 0, 0)))
+        for item_id, position in (("front", Position(0, 0, 0)), ("behind", Position(0, 0, 20)),
+                                  ("side", Position(30, 0, 0))):
+            cargo_system.add_item(make_item(item_id))
+            cargo_system.place_item(item_id, "C1", position)
+
+        for item_id in ("front", "behind", "side"):
+            path = optimize_retrieval(item_id, cargo_system, voxel=1)
+            self.assertTrue(path, item_id)
+            self.assertEqual(path[0]["z"], 0)
+            self.assertEqual(path[-1], cargo_system.items[item_id].position.to_dict())
+
+        # Nothing stands in front of "behind" within its footprint column except "front"
+        self.assertEqual(retrieval_plan("behind", cargo_system)["blockingItems"], ["front"])
+
+    def test_packed_items_without_blockers_are_reachable(self):
+        cargo_system = CargoSystem()
+        cargo_system.add_container(Container("C1", "A", Dimensions(60, 60, 60), Position(0, 0, 0)))
+        items = [make_item(f"i{n}", 10 + n % 3, 10 + n % 5, 10 + n % 4) for n in range(60)]
+        placements, _ = place_new_items(cargo_system, items)
+        self.assertTrue(placements)
+
+        clear = [item.id for item, _, _ in placements if not retrieval_plan(item.id, cargo_system)["blockingItems"]]
+        self.assertTrue(clear)
+        result = batch_retrieval(clear, cargo_system, voxel=1)
+        for item_id in clear:
+            self.assertTrue(result["paths"][item_id], item_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
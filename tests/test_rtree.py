@@ -0,0 +1,81 @@
+import math
+import random
+import unittest
+
+from app.rtree import ArrayRTreeIndex, RTreeIndex
+
+
+def random_box(rng, size=100, extent=12):
+    low = [rng.uniform(0, size) for _ in range(3)]
+    return tuple(low) + tuple(axis + rng.uniform(0.5, extent) for axis in low)
+
+
+def intersects(a, b):
+    return all(a[axis] <= b[axis + 3] and b[axis] <= a[axis + 3] for axis in range(3))
+
+
+def distance(bounds, point):
+    return math.sqrt(sum(max(bounds[axis] - point[axis], 0, point[axis] - bounds[axis + 3]) ** 2
+                         for axis in range(3)))
+
+
+class RTreeTestMixin:
+    tree_class = None
+
+    def setUp(self):
+        self.rng = random.Random(4)
+        self.boxes = {f"i{n}": random_box(self.rng) for n in range(400)}
+
+    def assertMatchesBruteForce(self, tree):
+        self.assertEqual(len(tree), len(self.boxes))
+        for _ in range(60):
+            query = random_box(self.rng, extent=30)
+            expected = sorted(item_id for item_id, box in self.boxes.items() if intersects(box, query))
+            self.assertEqual(sorted(tree.query(query)), expected)
+
+        point = tuple(self.rng.uniform(0, 100) for _ in range(3))
+        expected = sorted((distance(box, point), item_id) for item_id, box in self.boxes.items())[:10]
+        found = tree.nearest(point, 10)
+        self.assertEqual([item_id for item_id, _ in found], [item_id for _, item_id in expected])
+        for (_, found_distance), (expected_distance, _) in zip(found, expected):
+            self.assertAlmostEqual(found_distance, expected_distance)
+
+    def test_bulk_load_matches_brute_force(self):
+        self.assertMatchesBruteForce(self.tree_class.bulk_load(list(self.boxes.items())))
+
+    def test_inserts_match_brute_force(self):
+        tree = self.tree_class()
+        for item_id, box in self.boxes.items():
+            tree.insert(item_id, box)
+        self.assertMatchesBruteForce(tree)
+
+    def test_deletes_condense_and_match_brute_force(self):
+        tree = self.tree_class.bulk_load(list(self.boxes.items()))
+        for item_id in self.rng.sample(sorted(self.boxes), 300):
+            self.assertTrue(tree.delete(item_id))
+            del self.boxes[item_id]
+        self.assertFalse(tree.delete("missing"))
+        self.assertMatchesBruteForce(tree)
+
+        # Reinsert into the condensed tree, then empty it completely
+        for n in range(50):
+            self.boxes[f"new{n}"] = random_box(self.rng)
+            tree.insert(f"new{n}", self.boxes[f"new{n}"])
+        self.assertMatchesBruteForce(tree)
+        for item_id in list(self.boxes):
+            tree.delete(item_id)
+        self.boxes.clear()
+        self.assertEqual(tree.query((0, 0, 0, 100, 100, 100)), [])
+        self.assertEqual(len(tree), 0)
+
+
+class RTreeIndexTest(RTreeTestMixin, unittest.TestCase):
+    tree_class = RTreeIndex
+
+
+class ArrayRTreeIndexTest(RTreeTestMixin, unittest.TestCase):
+    tree_class = ArrayRTreeIndex
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+from app.benchmark import generate_station
+from app.models import CargoSystem
+from app.search import search_items, search_items_page
+
+
+def page_through(query, cargo_system, limit, **filters):
+    page = search_items_page(query, cargo_system, limit, **filters)
+    ids = [item.id for item in page.items]
+    while page.next_cursor is not None:
+        page = search_items_page(query, cargo_system, limit, page.next_cursor)
+        ids.extend(item.id for item in page.items)
+    return ids
+
+
+class SearchPageTest(unittest.TestCase):
+    def setUp(self):
+        self.cargo_system = CargoSystem()
+        containers, items = generate_station(300, seed=2)
+        for container in containers:
+            self.cargo_system.add_container(container)
+        self.cargo_system.add_items(items)
+
+    def test_pages_concatenate_to_the_full_ranking(self):
+        queries = ["kit", "food", "medical spare", "food tool science kit 17", "no-such-term"]
+        for query in queries:
+            for limit in (1, 7, 50, 1000):
+                expected = [item.id for item in search_items(query, self.cargo_system)]
+                self.assertEqual(page_through(query, self.cargo_system, limit), expected, (query, limit))
+
+    def test_filtered_pages_match_search_items(self):
+        query = "food tool"
+        for priority in (1, 3, 5):
+            expected = [item.id for item in search_items(query, self.cargo_system, priority=priority)]
+            self.assertEqual(page_through(query, self.cargo_system, 5, priority=priority), expected, priority)
+
+    def test_cursor_expires_when_inventory_changes(self):
+        page = search_items_page("food", self.cargo_system, 1)
+        self.assertIsNotNone(page.next_cursor)
+        self.cargo_system.remove_item(page.items[0].id)
+        with self.assertRaises(ValueError):
+            search_items_page("food", self.cargo_system, 1, page.next_cursor)
+
+
+if __name__ == "__main__":
+    unittest.main()